@@ -1,14 +1,16 @@
 # ---------------- ⬇  app.py (TOP) ⬇ ----------------
-from llama_index.llms.ollama import Ollama
 import streamlit as st
 import os
 import json
 import random
 import requests
 from legal_backend import (
-    load_document, summarize_document, highlight_clauses, answer_query,
-    clause_breakdown, simplify_legal_jargon, extract_entities,
-    compare_documents,
+    llm, load_document, compare_documents, analyze_document, session_history,
+    clause_breakdown,
+    set_current_user, metrics_snapshot,
+    stream_summarize_document, stream_highlight_clauses,
+    stream_clause_breakdown, stream_simplify_legal_jargon,
+    stream_extract_entities, stream_answer_query,
 )
 from streamlit_extras.let_it_rain import rain
 from streamlit_lottie import st_lottie
@@ -221,6 +223,17 @@ def load_lottie(url: str):
         return None
 
 
+def stream_to_screen(tokens):
+    # Render tokens as they arrive; the caller shows the final result
+    placeholder = st.empty()
+    text = ""
+    for token in tokens:
+        text += token
+        placeholder.markdown(text + "▌")
+    placeholder.empty()
+    return text
+
+
 if st.session_state.get("first_time", True):
     lottie_json = load_lottie(
         "https://assets7.lottiefiles.com/packages/lf20_1pxqjqps.json")
@@ -286,6 +299,9 @@ if not st.session_state.authenticated:
     st.markdown('</div>', unsafe_allow_html=True)
     st.stop()
 
+# Tag everything this rerun logs with the signed-in user
+set_current_user(st.session_state.user)
+
 # ---------------- SIDEBAR & REST OF APP (unchanged) ------------------------
 #   (leave all your existing code here)
 
@@ -314,12 +330,12 @@ if ask_now and user_q.strip():
     if question_type == "Document-Based":
         if uploaded_file:
             docs = load_document(os.path.join("data", uploaded_file.name))
-            st.write(answer_query(docs, user_q))
+            st.write_stream(stream_answer_query(
+                docs, user_q, session_id=st.session_state.user))
         else:
             st.warning(
                 "📁 Please upload a document first for document-based questions.")
     else:
-        general_llm = Ollama(model="llama3")
         with st.spinner("Thinking..."):
             prompt = f"""
 You are a witty but ethical legal assistant AI. Answer the following question with a mix of accuracy and mild wit, without encouraging illegal behavior.
@@ -334,7 +350,7 @@ End with:
 
 User's Question: {user_q}
 AI:"""
-            result = general_llm.complete(prompt)
+            result = llm.complete(prompt)  # shared pooled client
             st.markdown(
                 f"""<div class='answer-box'>{result.text.strip()}</div>""",
                 unsafe_allow_html=True
@@ -408,6 +424,25 @@ if uploaded_file:
         if not docs:
             st.error("❌ Could not extract text. Try a different document.")
             st.stop()
+
+        # --- FULL REPORT (all analyses in one concurrent pass) ---
+        if col3.button("🧾 Full Report", help="Run every analysis at once on a shared index"):
+            with st.spinner("Running full analysis..."):
+                report = analyze_document(docs)
+            result_keys = {
+                "summary": ("summary_result", "toggle_summary"),
+                "clauses": ("highlight_result", "toggle_clauses"),
+                "breakdown": ("breakdown_result", "toggle_breakdown"),
+                "simplify": ("simplified_output", "toggle_simplify"),
+                "entities": ("entities_result", "toggle_entities"),
+            }
+            for name, (result_key, toggle_key) in result_keys.items():
+                if name in report["results"]:
+                    st.session_state[result_key] = report["results"][name]
+                else:
+                    st.session_state[result_key] = f"❌ {report['errors'].get(name)}"
+                st.session_state[toggle_key] = True
+            st.caption(f"⏱️ Full report in {report['timings']['total']}s")
         # --- SUMMARIZE ---
         if col1.button("📄 Summarize Document", help="Generate a short summary of the uploaded legal doc"):
             st.session_state.run_summary = True
@@ -415,7 +450,7 @@ if uploaded_file:
 
         if st.session_state.run_summary:
             with st.spinner("Summarizing..."):
-                summary = summarize_document(docs)
+                summary = stream_to_screen(stream_summarize_document(docs))
                 if not summary.strip():
                     st.error("❌ Summarization failed.")
                     st.stop()
@@ -451,7 +486,8 @@ if uploaded_file:
 
         if st.session_state.run_highlight:
             with st.spinner("Extracting clauses..."):
-                st.session_state.highlight_result = highlight_clauses(docs)
+                st.session_state.highlight_result = stream_to_screen(
+                    stream_highlight_clauses(docs))
                 st.session_state.run_highlight = False
 
         if st.session_state.toggle_clauses and "highlight_result" in st.session_state:
@@ -464,10 +500,17 @@ if uploaded_file:
         if st.button("📊 Clause Breakdown", help="Break down complex clauses into understandable parts"):
             st.session_state.run_breakdown = True
             st.session_state.toggle_breakdown = True
+        st.checkbox("✏️ Only re-analyze clauses changed since the last revision",
+                    key="breakdown_incremental",
+                    help="Reuses explanations for unchanged clauses of earlier uploads of this contract")
 
         if st.session_state.run_breakdown:
             with st.spinner("Analyzing clauses..."):
-                st.session_state.breakdown_result = clause_breakdown(docs)
+                if st.session_state.get("breakdown_incremental"):
+                    st.session_state.breakdown_result = clause_breakdown(docs, incremental=True)
+                else:
+                    st.session_state.breakdown_result = stream_to_screen(
+                        stream_clause_breakdown(docs))
                 st.session_state.run_breakdown = False
 
         if st.session_state.toggle_breakdown and "breakdown_result" in st.session_state:
@@ -483,8 +526,8 @@ if uploaded_file:
 
         if st.session_state.run_simplify:
             with st.spinner("Simplifying..."):
-                st.session_state.simplified_output = simplify_legal_jargon(
-                    docs)
+                st.session_state.simplified_output = stream_to_screen(
+                    stream_simplify_legal_jargon(docs))
                 st.session_state.run_simplify = False
 
         if st.session_state.toggle_simplify and "simplified_output" in st.session_state:
@@ -501,7 +544,8 @@ if uploaded_file:
         if st.session_state.run_entities:
             with st.spinner("Identifying entities..."):
                 try:
-                    st.session_state.entities_result = extract_entities(docs)
+                    st.session_state.entities_result = stream_to_screen(
+                        stream_extract_entities(docs))
                 except Exception as e:
                     st.session_state.entities_result = f"❌ Failed to extract entities: {e}"
                 st.session_state.run_entities = False
@@ -562,7 +606,7 @@ with st.expander("🆚 Compare Two Docs"):
 
 # --- CHAT HISTORY (toggle) ---
 with st.expander("💬 Chat History"):
-    history = st.session_state.get("history", [])
+    history = session_history(st.session_state.user)
     if not history:
         st.write("No chat yet.")
     else:
@@ -578,6 +622,18 @@ with st.expander("🗂️ Document History"):
     else:
         st.write("No documents uploaded yet.")
 
+# --- PIPELINE TIMINGS (sidebar) ---
+with st.sidebar.expander("⏱️ Pipeline Timings"):
+    snapshot = metrics_snapshot()
+    if snapshot["stages"]:
+        st.table([{"stage": stage, **values}
+                  for stage, values in sorted(snapshot["stages"].items())])
+    else:
+        st.write("No timings yet.")
+    for name, stats in snapshot["caches"].items():
+        st.caption(f"{name} cache: {stats['hit_rate']:.0%} hits "
+                   f"({stats['hits']}/{stats['hits'] + stats['misses']})")
+
 # --- FOOTER FACT ---
 st.markdown("### ⚖️ Daily Legal Fact")
 st.info(random.choice([
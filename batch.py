@@ -0,0 +1,229 @@
+"""Batch-process a folder of contracts through the legal_backend analyses.
+
+    python batch.py data/ --output outputs/batch.jsonl --analyses summary,entities,clauses
+
+Extraction runs across a process pool; LLM calls are bounded per Ollama host
+by the shared pool in legal_backend.
+Every finished file is appended to the output JSONL, which doubles as the
+checkpoint: re-running the same command skips files already done.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import ocr
+from utils.disk_cache import file_hash
+from utils.extraction import load_text
+
+
+SUPPORTED = (".pdf", ".docx", ".txt")
+
+
+def discover(input_dir):
+    paths = []
+    for dirpath, _, filenames in os.walk(input_dir):
+        for name in filenames:
+            if name.lower().endswith(SUPPORTED):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def load_checkpoint(output_path):
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            if record.get("status") == "ok":
+                done.add((record["file"], record["file_hash"]))
+    return done
+
+
+def _init_extract_worker(ocr_workers):
+    # Each extract worker gets its share of the cores for OCR, instead of
+    # every worker starting a pool as large as the machine
+    ocr.set_workers(ocr_workers)
+
+
+def extract(path):
+    # Runs in a worker process; hits the shared on-disk text cache. Only the
+    # light extraction module is loaded here, never the models or indexes.
+    t0 = time.perf_counter()
+    key, entry = load_text(path)
+    return key, entry, time.perf_counter() - t0
+
+
+async def process_file(backend, path, digest, analyses, extract_pool, add_to_corpus=False):
+    loop = asyncio.get_running_loop()
+    record = {"file": path, "file_hash": digest, "results": {},
+              "errors": {}, "timings": {}}
+    stage = "extract"
+    try:
+        key, entry, seconds = await loop.run_in_executor(extract_pool, extract, path)
+        documents = backend.documents_from_text(path, key, entry)
+        record["timings"]["extract"] = round(seconds, 3)
+
+        if add_to_corpus:
+            stage = "corpus"
+            t0 = time.perf_counter()
+            record["doc_hash"] = await backend.aadd_to_corpus(documents)
+            record["timings"]["corpus"] = round(time.perf_counter() - t0, 3)
+
+        stage = "index"
+        t0 = time.perf_counter()
+        index = None
+        if any(name != "summary" for name in analyses):
+            index = await backend.abuild_index(documents)
+        record["timings"]["index"] = round(time.perf_counter() - t0, 3)
+
+        async def run(name):
+            t0 = time.perf_counter()
+            try:
+                record["results"][name] = await backend.ASYNC_ANALYSES[name](
+                    documents, index=index)
+            except Exception as e:
+                record["errors"][name] = str(e)
+            record["timings"][name] = round(time.perf_counter() - t0, 3)
+
+        await asyncio.gather(*[run(name) for name in analyses])
+    except Exception as e:
+        record["errors"][stage] = str(e)
+
+    record["status"] = "failed" if record["errors"] else "ok"
+    return record
+
+
+def report(records, elapsed, skipped):
+    stages = {}
+    for record in records:
+        for stage, seconds in record["timings"].items():
+            stages.setdefault(stage, []).append(seconds)
+
+    def pct(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    ok = sum(1 for r in records if r["status"] == "ok")
+    return {
+        "processed": len(records),
+        "ok": ok,
+        "failed": len(records) - ok,
+        "skipped_from_checkpoint": skipped,
+        "wall_seconds": round(elapsed, 2),
+        "docs_per_hour": round(len(records) / elapsed * 3600, 1) if elapsed else 0.0,
+        "stages": {
+            stage: {
+                "count": len(values),
+                "mean": round(statistics.mean(values), 3),
+                "p50": pct(values, 0.5),
+                "p95": pct(values, 0.95),
+                "total": round(sum(values), 2),
+            }
+            for stage, values in stages.items()
+        },
+    }
+
+
+def write_parquet(jsonl_path, parquet_path):
+    try:
+        import pandas as pd
+    except ImportError:
+        print("⚠️ pandas/pyarrow not installed; skipping Parquet export.")
+        return
+    frame = pd.read_json(jsonl_path, lines=True)
+    for column in ("results", "errors", "timings"):
+        frame[column] = frame[column].map(json.dumps)
+    frame.to_parquet(parquet_path, index=False)
+    print(f"📦 Parquet written to {parquet_path}")
+
+
+async def run_batch(args):
+    # Imported here, not at the top: spawned extract and OCR workers re-run
+    # this module and must not each load the models and corpus
+    import legal_backend as backend
+
+    analyses = [a.strip() for a in args.analyses.split(",") if a.strip()]
+    unknown = [a for a in analyses if a not in backend.ASYNC_ANALYSES]
+    if unknown:
+        raise SystemExit(f"Unknown analyses: {', '.join(unknown)}")
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    done = load_checkpoint(args.output)
+    paths = discover(args.input_dir)
+
+    todo = []
+    for path in paths:
+        digest = file_hash(path)
+        if (path, digest) not in done:
+            todo.append((path, digest))
+    skipped = len(paths) - len(todo)
+    print(f"📂 {len(paths)} files, {skipped} already done, {len(todo)} to process")
+
+    # The limit applies to the LLM calls themselves, whichever analysis makes them
+    backend.llm.set_max_inflight(args.concurrency)
+    llm_capacity = args.concurrency * len(backend.llm.hosts)
+    # Bound how many documents are open at once, independent of corpus size
+    doc_slots = asyncio.Semaphore(max(llm_capacity, args.extract_workers) * 2)
+    ocr_workers = max(1, (os.cpu_count() or 1) // args.extract_workers)
+    records = []
+    start = time.perf_counter()
+
+    # spawn: workers start clean instead of forking a process with live threads
+    extract_pool = ProcessPoolExecutor(
+        max_workers=args.extract_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_extract_worker, initargs=(ocr_workers,))
+    with extract_pool, open(args.output, "a", encoding="utf-8") as out:
+
+        async def handle(path, digest):
+            async with doc_slots:
+                record = await process_file(
+                    backend, path, digest, analyses, extract_pool, args.corpus)
+            # Checkpoint: one line per finished file, flushed immediately
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            records.append(record)
+            mark = "✅" if record["status"] == "ok" else "❌"
+            print(f"{mark} [{len(records)}/{len(todo)}] {path}")
+
+        await asyncio.gather(*[handle(path, digest) for path, digest in todo])
+
+    stats = report(records, time.perf_counter() - start, skipped)
+    print(json.dumps(stats, indent=2))
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+    return stats
+
+
+def main():
+    import legal_backend as backend
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input_dir")
+    parser.add_argument("--output", default=os.path.join("outputs", "batch.jsonl"))
+    parser.add_argument("--parquet", help="also export results to this Parquet file")
+    parser.add_argument("--stats", help="write the timing report to this JSON file")
+    parser.add_argument("--analyses", default="summary,entities,clauses")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--corpus", action="store_true",
+                        help="also add every document to the persistent corpus index")
+    parser.add_argument("--concurrency", type=int, default=backend.llm.max_inflight,
+                        help="max LLM calls in flight per Ollama host")
+    asyncio.run(run_batch(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+import random
+
+
+HEADINGS = [
+    "DEFINITIONS", "TERM", "RENT AND PAYMENT", "SECURITY DEPOSIT",
+    "USE OF PREMISES", "MAINTENANCE AND REPAIRS", "CONFIDENTIALITY",
+    "INDEMNIFICATION", "LIMITATION OF LIABILITY", "INSURANCE",
+    "TERMINATION", "FORCE MAJEURE", "DISPUTE RESOLUTION", "GOVERNING LAW",
+    "NOTICES", "ASSIGNMENT", "MISCELLANEOUS",
+]
+
+SENTENCES = [
+    "The Tenant shall pay the monthly rent of ${amount:,} on or before the {day}th day of each calendar month.",
+    "Either party may terminate this Agreement upon {days} days' prior written notice to the other party.",
+    "The Receiving Party shall hold all Confidential Information in strict confidence for a period of {years} years.",
+    "Neither party shall be liable for any indirect, incidental or consequential damages arising under Section {ref}.",
+    "Any dispute arising out of this Agreement shall be referred to arbitration in accordance with Section {ref}.",
+    "The Landlord shall maintain the structural elements of the Premises in good repair at its own cost.",
+    "Late payments shall accrue interest at {pct}% per annum until paid in full.",
+    "This Agreement shall be governed by the laws of the State of {state}.",
+    "The Service Provider shall maintain commercial general liability insurance of not less than ${amount:,}.",
+    "All notices under this Agreement shall be in writing and delivered to the addresses set out in Schedule {schedule}.",
+]
+
+STATES = ["New York", "California", "Delaware", "Texas", "Maharashtra", "Karnataka"]
+
+
+def contract_text(sections=60, seed=7):
+    """A deterministic contract with `sections` numbered, sub-claused sections."""
+    rng = random.Random(seed)
+    lines = [
+        "MASTER SERVICES AGREEMENT",
+        "",
+        'This Master Services Agreement (the "Agreement") is entered into on '
+        'January 1, 2024 by and between Acme Holdings LLC (the "Landlord") '
+        'and Globex Corporation (the "Tenant").',
+        "",
+        "RECITALS",
+        "WHEREAS, the parties wish to set out the terms of their relationship;",
+        "",
+    ]
+    for number in range(1, sections + 1):
+        heading = HEADINGS[(number - 1) % len(HEADINGS)]
+        lines.append(f"{number}. {heading}")
+        for sub in range(1, rng.randint(3, 6)):
+            body = " ".join(
+                rng.choice(SENTENCES).format(
+                    amount=rng.randrange(1000, 500000, 250), day=rng.randint(1, 28),
+                    days=rng.choice([15, 30, 60, 90]), years=rng.randint(1, 7),
+                    ref=f"{rng.randint(1, sections)}.{rng.randint(1, 5)}",
+                    pct=rng.choice([1.5, 2, 5, 12]), state=rng.choice(STATES),
+                    schedule=rng.choice("ABC"))
+                for _ in range(rng.randint(3, 7)))
+            lines.append(f"{number}.{sub} {body}")
+        lines.append("")
+    lines += ["IN WITNESS WHEREOF, the parties have executed this Agreement.",
+              "", "Landlord: ____________________", "Tenant: ____________________"]
+    return "\n".join(lines)
+
+
+def write_txt(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def write_docx(path, text):
+    from docx import Document
+
+    doc = Document()
+    for line in text.split("\n"):
+        doc.add_paragraph(line)
+    doc.save(path)
+
+
+def write_pdf(path, text):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", size=10)
+    for line in text.split("\n"):
+        pdf.multi_cell(0, 5, line.encode("latin-1", "replace").decode("latin-1"))
+    pdf.output(path)
+
+
+def write_scanned_pdf(path, text, pages=4):
+    # Image-only pages, so extraction has to go through OCR
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.load_default(size=22)
+    except TypeError:
+        font = ImageFont.load_default()
+    lines = [l for l in text.split("\n") if l][: pages * 40]
+    images = []
+    for page in range(pages):
+        img = Image.new("RGB", (1700, 2200), "white")
+        draw = ImageDraw.Draw(img)
+        for row, line in enumerate(lines[page * 40:(page + 1) * 40]):
+            draw.text((80, 80 + row * 50), line[:110], fill="black", font=font)
+        images.append(img)
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=200)
+
+
+def build_corpus(root, sizes=(5, 60), seed=7):
+    """Write the benchmark corpus under `root`; returns {name: path}."""
+    os.makedirs(root, exist_ok=True)
+    corpus = {}
+    for sections in sizes:
+        text = contract_text(sections, seed)
+        for ext, writer in (("txt", write_txt), ("docx", write_docx), ("pdf", write_pdf)):
+            path = os.path.join(root, f"contract_{sections}.{ext}")
+            if not os.path.exists(path):
+                writer(path, text)
+            corpus[f"{ext}_{sections}"] = path
+    scanned = os.path.join(root, "contract_scanned.pdf")
+    if not os.path.exists(scanned):
+        write_scanned_pdf(scanned, contract_text(5, seed))
+    corpus["scanned_pdf"] = scanned
+    return corpus
@@ -0,0 +1,225 @@
+"""Reproducible stage benchmarks for legal_backend.
+
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --compare bench.json   # vs. a saved run
+
+Runs in a scratch workspace (fresh caches) against the bundled fake Ollama
+server, so results depend only on the code and the machine.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.corpus import build_corpus  # noqa: E402
+from utils.fake_ollama import serve  # noqa: E402
+
+
+QUERIES = [
+    "What is the notice period for termination?",
+    "Who is liable for indirect damages?",
+    "How much is the security deposit?",
+    "Which law governs the agreement?",
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    pos = (len(values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def measure(name, fn, repeat, warmup=1, units=None, unit_name=None, setup=None):
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    result = {
+        "name": name,
+        "repeat": repeat,
+        "p50_s": round(percentile(samples, 0.5), 5),
+        "p95_s": round(percentile(samples, 0.95), 5),
+        "mean_s": round(statistics.mean(samples), 5),
+        "min_s": round(min(samples), 5),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if units:
+        result[f"{unit_name}_per_s"] = round(units / result["p50_s"], 2)
+    print(f"  {name:<38} p50 {result['p50_s']:>9.4f}s  p95 {result['p95_s']:>9.4f}s"
+          f"  rss {result['peak_rss_mb']:>7.1f} MB")
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    workspace = tempfile.mkdtemp(prefix="legal-bench-")
+    corpus_dir = args.corpus or os.path.join(workspace, "corpus")
+    print(f"📂 Workspace {workspace}")
+    corpus = build_corpus(corpus_dir)
+    for name in os.listdir(os.path.join(REPO_ROOT, "data")):
+        if name.endswith(".pdf"):
+            corpus[f"sample_{os.path.splitext(name)[0]}"] = os.path.join(REPO_ROOT, "data", name)
+
+    # Fresh caches and logs: the backend uses cwd-relative paths
+    os.symlink(os.path.join(REPO_ROOT, "prompts"), os.path.join(workspace, "prompts"))
+    os.chdir(workspace)
+    server, url = serve(latency=args.llm_latency, token_delay=args.token_delay)
+    os.environ["OLLAMA_HOSTS"] = url
+
+    import legal_backend as backend
+    from llama_index.core import VectorStoreIndex
+    from utils.extraction import extract_text
+
+    results = []
+    repeat = args.repeat
+
+    print("⏱️ Extraction (cold: no text cache)")
+    texts = {}
+    for name, path in sorted(corpus.items()):
+        if name == "scanned_pdf" and args.skip_ocr:
+            continue
+        size_mb = os.path.getsize(path) / 1e6
+        results.append(measure(f"extract/{name}", lambda p=path: extract_text(p),
+                               1 if name == "scanned_pdf" else repeat,
+                               warmup=0 if name == "scanned_pdf" else 1,
+                               units=size_mb, unit_name="mb"))
+        texts[name] = backend.load_document(path)
+
+    print("⏱️ Extraction (warm: text cache)")
+    results.append(measure("load_document/warm/pdf_60",
+                           lambda: backend.load_document(corpus["pdf_60"]), repeat))
+
+    print("⏱️ Indexing")
+    docs = texts["txt_60"]
+    raw_embed = backend.embed_model._inner
+    results.append(measure(
+        "build_index/cold/txt_60",
+        lambda: VectorStoreIndex.from_documents(
+            docs, embed_model=raw_embed, transformations=[backend.clause_parser]),
+        max(1, repeat // 2)))
+    results.append(measure(
+        "build_index/chunk_cache/txt_60",
+        lambda: backend._index_documents(docs), repeat))
+    backend.build_index(docs)
+    results.append(measure("build_index/warm/txt_60",
+                           lambda: backend.build_index(docs), repeat))
+
+    print("⏱️ Retrieval")
+    index = backend.build_index(docs)
+    retriever = backend._retriever(index, backend.QA_TOP_K)
+    results.append(measure("retrieval/top_k",
+                           lambda: [retriever.retrieve(q) for q in QUERIES], repeat,
+                           units=len(QUERIES), unit_name="queries"))
+
+    print("⏱️ End-to-end analyses (fake LLM, no response cache)")
+
+    def cold_llm_caches():
+        backend.response_cache.clear()
+
+    for name in ("txt_5", "txt_60"):
+        results.append(measure(
+            f"analyze_document/{name}",
+            lambda d=texts[name]: backend.analyze_document(d),
+            max(1, repeat // 2), setup=cold_llm_caches))
+    results.append(measure(
+        "answer_query/txt_60",
+        lambda: [backend.answer_query(docs, q, session_id="bench") for q in QUERIES],
+        repeat, setup=cold_llm_caches, units=len(QUERIES), unit_name="queries"))
+
+    backend.log_store.flush()
+    server.shutdown()
+    os.chdir(REPO_ROOT)
+    if not args.keep_workspace:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    return {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": vars(args),
+        "peak_rss_mb": peak_rss_mb(),
+        "benchmarks": results,
+    }
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {b["name"]: b for b in json.load(f)["benchmarks"]}
+    print(f"\n📊 vs {baseline_path}")
+    for bench in report["benchmarks"]:
+        old = baseline.get(bench["name"])
+        if not old:
+            continue
+        change = (bench["p50_s"] - old["p50_s"]) / old["p50_s"] * 100 if old["p50_s"] else 0.0
+        flag = "🔺" if change > 10 else "🔻" if change < -10 else "  "
+        print(f"  {flag} {bench['name']:<38} {old['p50_s']:>9.4f}s → "
+              f"{bench['p50_s']:>9.4f}s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--corpus", help="reuse/generate the corpus in this folder")
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="fake Ollama time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--skip-ocr", action="store_true",
+                        help="skip the scanned-PDF case (no tesseract/poppler)")
+    parser.add_argument("--keep-workspace", action="store_true")
+    args = parser.parse_args()
+    # The run happens in a scratch cwd; pin user-supplied paths first
+    for attr in ("output", "compare", "corpus"):
+        if getattr(args, attr):
+            setattr(args, attr, os.path.abspath(getattr(args, attr)))
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,37 @@
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
-from llama_index.llms.ollama import Ollama
 from llama_index.core import VectorStoreIndex, Settings
 from llama_index.core import Document as LlamaDocument
+from llama_index.core import QueryBundle
+from llama_index.core.query_engine import RetrieverQueryEngine
 import os
-import pytesseract
-from pdf2image import convert_from_path
-from docx import Document as DocxDocument
-from datetime import datetime
-import csv
-from utils.prompt_loader import load_prompts
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+import re
+import threading
+import time
+from utils.prompt_loader import load_prompts, prompts_version
+from utils.llm_pool import OllamaPool
+from utils.index_cache import IndexCache
+from utils.embedding_cache import CachedEmbedding
+from utils.summarizer import MapReduceSummarizer
+from utils.extraction import load_text
+from utils.disk_cache import content_hash
+from utils.tokens import estimate_tokens, fit_to_budget
+from utils.session_store import SessionStore, SQLiteSessionBackend
+from utils.response_cache import ResponseCache
+from utils.log_store import LogStore, current_user
+from utils.metrics import metrics
+from utils.clause_chunker import (
+    CHUNKER_VERSION, ClauseNodeParser, split_clauses, section_label)
+from utils.clause_store import ClauseStore, align_clauses, clause_hash, document_family
+from utils.clause_align import similarity_matrix, assign, word_diff, diff_ratio
+from utils.corpus_index import CorpusIndex, guess_doc_type
+from utils.hybrid_retriever import HybridRetriever, bm25_for_index
+from utils.entity_rules import extract_rule_entities, unique_values
+from utils.clause_classifier import ClauseClassifier, load_seeds
 
 
 prompts = load_prompts()  # 🔑 Load all prompts from JSON
@@ -17,197 +39,1233 @@ prompts = load_prompts()  # 🔑 Load all prompts from JSON
 
 # ✅ Setup: LLM + Embedding
 
-llm = Ollama(
+# OLLAMA_HOSTS: comma-separated Ollama servers to spread requests across
+OLLAMA_HOSTS = os.environ.get(
+    "OLLAMA_HOSTS",
+    "http://host.docker.internal:11434",  # ← to access host machine from Docker
+).split(",")
+
+llm = OllamaPool(
     model="llama3",
-    # ← to access host machine from Docker
-    base_url="http://host.docker.internal:11434",
-    request_timeout=120
+    hosts=[h.strip() for h in OLLAMA_HOSTS if h.strip()],
+    max_inflight=int(os.environ.get("OLLAMA_MAX_INFLIGHT", "2")),  # per host
+    request_timeout=120,
 )
 
 
-embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
+EMBED_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+EMBED_BATCH_SIZE = 64  # bge-small sweet spot on CPU
+
+# 🧩 Chunk-level cache: only unseen chunks reach the model
+embed_model = CachedEmbedding(
+    HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME,
+                         embed_batch_size=EMBED_BATCH_SIZE))
 Settings.llm = llm
 Settings.embed_model = embed_model
+# Smaller chunks let retrieval fill a fixed prompt budget with several hits
+CHUNK_SIZE = 512
+Settings.chunk_size = CHUNK_SIZE
 
-chat_history = []
+# ✂️ One node per contract clause (section path in metadata), capped at CHUNK_SIZE
+clause_parser = ClauseNodeParser(max_tokens=CHUNK_SIZE)
 
+# 🏷️ Local clause tagger: nearest seed-set centroid over the bge vectors
+clause_classifier = ClauseClassifier(embed_model.get_text_embedding_batch, load_seeds())
+STRUCTURAL_KINDS = ("preamble", "recital", "signature")
 
-def load_document(file_path):
-    text = ""
-    try:
-        if file_path.endswith(".txt"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
+# 🗂️ One persisted index per document text + embedding model
+index_cache = IndexCache()
 
-        elif file_path.endswith(".docx"):
-            doc = DocxDocument(file_path)
-            text = "\n".join([p.text for p in doc.paragraphs])
+# 💬 Conversations are scoped per session/user id.
+# LEGAL_SESSION_STORE=sqlite shares them between server workers.
+SESSION_MAX_TOKENS = 2000
+SESSION_TTL_SECONDS = 60 * 60
+COMPACT_SESSIONS = os.environ.get("LEGAL_COMPACT_SESSIONS") == "1"
 
-        elif file_path.endswith(".pdf"):
-            try:
-                from llama_index.readers.file import PDFReader
-                reader = PDFReader()
-                pdf_docs = reader.load_data(file_path)
-                text = "\n".join([doc.text for doc in pdf_docs])
-            except Exception:
-                images = convert_from_path(file_path)
-                for img in images:
-                    text += pytesseract.image_to_string(img)
+# 💬 Retrieval QA: prompt size stays flat however long the doc or chat gets
+QA_TOP_K = 4  # hybrid retrieval is precise enough for a small k
+QA_CONTEXT_TOKENS = 2400
+QA_HISTORY_TOKENS = 600
+
+SINGLE_PASS_CHARS = 12000  # approx 3000 tokens, one LLM call
+MAX_LLM_INFLIGHT = 4
+
+# 🧵 CPU-bound work (parsing, OCR, embedding) runs here, off the event loop
+worker_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4)
+
+# ♻️ Identical prompt + model + params + document → cached answer, no GPU time
+response_cache = ResponseCache(version=prompts_version())
+
+
+def _llm_params():
+    return {"temperature": llm.temperature,
+            "context_window": llm.context_window,
+            **llm.additional_kwargs}
+
+
+def _doc_hash(documents):
+    return content_hash(*[doc.text for doc in documents])
+
+
+def _count_tokens(prompt, completion):
+    metrics.inc("legal_llm_tokens_total", estimate_tokens(prompt), kind="prompt")
+    metrics.inc("legal_llm_tokens_total", estimate_tokens(completion), kind="completion")
+
+
+def _complete_text(prompt, doc_hash=None):
+    key = response_cache.key(prompt, llm.model, _llm_params(), doc_hash)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    with metrics.timed("llm_generate", mode="complete"):
+        text = llm.complete(prompt).text
+    _count_tokens(prompt, text)
+    response_cache.put(key, text)
+    return text
+
+
+async def _acomplete_text(prompt, doc_hash=None):
+    # Cache reads and writes are SQLite calls that can wait on other
+    # processes' locks, so they run in the worker pool like other blocking work
+    key = response_cache.key(prompt, llm.model, _llm_params(), doc_hash)
+    cached = await _in_worker(response_cache.get, key)
+    if cached is not None:
+        return cached
+    with metrics.timed("llm_generate", mode="acomplete"):
+        text = (await llm.acomplete(prompt)).text
+    _count_tokens(prompt, text)
+    await _in_worker(response_cache.put, key, text)
+    return text
+
+
+def _stream_complete(prompt, doc_hash=None):
+    key = response_cache.key(prompt, llm.model, _llm_params(), doc_hash)
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    started = time.perf_counter()
+    with metrics.timed("llm_generate", mode="stream"):
+        for chunk in llm.stream_complete(prompt):
+            if chunk.delta:
+                if not parts:
+                    metrics.observe("legal_stage_seconds",
+                                    time.perf_counter() - started,
+                                    stage="llm_first_token")
+                parts.append(chunk.delta)
+                yield chunk.delta
+    _count_tokens(prompt, "".join(parts))
+    response_cache.put(key, "".join(parts))
+
+
+def _query_key(documents, prompt):
+    # Query-engine answers depend on the document and on what retrieval
+    # hands the LLM, so chunking and candidate settings are part of the key
+    params = dict(_llm_params(), engine="query", retriever="hybrid",
+                  top_k=QUERY_TOP_K, candidates=HYBRID_CANDIDATES,
+                  embed_model=EMBED_MODEL_NAME, chunker=CHUNKER_VERSION,
+                  chunk_size=CHUNK_SIZE)
+    return response_cache.key(prompt, llm.model, params, _doc_hash(documents))
+
+
+summarizer = MapReduceSummarizer(
+    _complete_text,
+    prompts,
+    max_inflight=MAX_LLM_INFLIGHT,
+    acomplete_fn=_acomplete_text,
+)
+
+
+def _compact_history(summary, transcript):
+    prompt = prompts["compact_history"].format(
+        summary=summary or "(none)", transcript=transcript)
+    return _complete_text(prompt)
+
+
+sessions = SessionStore(
+    backend=SQLiteSessionBackend()
+    if os.environ.get("LEGAL_SESSION_STORE") == "sqlite" else None,
+    max_tokens=SESSION_MAX_TOKENS,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    compact_fn=_compact_history if COMPACT_SESSIONS else None,
+)
 
-        if not text.strip():
-            raise ValueError(
-                "❌ No extractable text found in the uploaded document.")
 
-        return [LlamaDocument(text=text)]
+def session_history(session_id="default"):
+    return sessions.get(session_id)[1]
+
+
+def clear_session(session_id="default"):
+    sessions.clear(session_id)
+
+
+def _make_document(text, metadata=None):
+    metadata = metadata or {}
+    # Bookkeeping metadata must not leak into embeddings or prompts
+    return LlamaDocument(
+        text=text,
+        metadata=metadata,
+        excluded_embed_metadata_keys=list(metadata),
+        excluded_llm_metadata_keys=list(metadata),
+    )
+
+
+def documents_from_text(file_path, key, entry):
+    """Documents for a text-cache entry, e.g. one extracted in another process."""
+    # Node metadata is copied into every node and saved with every cached
+    # index, so it keeps scalars only; per-page OCR pages and timings stay in
+    # the text-cache entry and go to metrics when the file is extracted
+    metadata = {k: v for k, v in entry["metadata"].items()
+                if not isinstance(v, (list, dict))}
+    if "ocr_pages" in entry["metadata"]:
+        metadata["ocr_page_count"] = len(entry["metadata"]["ocr_pages"])
+    metadata.update(file_hash=key, file_name=os.path.basename(file_path))
+    return [_make_document(entry["text"], metadata)]
+
+
+def load_document(file_path):
+    try:
+        return documents_from_text(file_path, *load_text(file_path))
 
     except Exception as e:
         raise RuntimeError(f"Failed to load document: {e}")
 
 
+# 🔀 Hybrid retrieval: BM25 catches exact terms ("12.3(b)", party names)
+QUERY_TOP_K = 2
+HYBRID_CANDIDATES = 10  # per retriever, before reciprocal rank fusion
+
+
+def _index_documents(documents):
+    index = VectorStoreIndex.from_documents(
+        documents, transformations=[clause_parser])
+    # Keyword index is built with the vector index and cached next to it
+    index.bm25 = bm25_for_index(index)
+    return index
+
+
+def _retriever(index, top_k):
+    if getattr(index, "bm25", None) is None:
+        index.bm25 = bm25_for_index(index)  # indexes cached before BM25 existed
+    return HybridRetriever(index, index.bm25, similarity_top_k=top_k,
+                           candidate_k=HYBRID_CANDIDATES)
+
+
+def _query_engine(index, streaming=False):
+    return RetrieverQueryEngine.from_args(
+        _retriever(index, QUERY_TOP_K), llm=llm, streaming=streaming)
+
+
 def build_index(documents):
-    return VectorStoreIndex.from_documents(documents)
+    with metrics.timed("build_index"):
+        return index_cache.get_or_build(
+            documents, f"{EMBED_MODEL_NAME}|{CHUNKER_VERSION}|chunk={CHUNK_SIZE}",
+            _index_documents)
+
+
+def _refresh_cache_gauges():
+    for name, stats in (("embedding", embed_model.stats()),
+                        ("response", response_cache.stats()),
+                        ("index", index_cache.stats())):
+        metrics.set_gauge("legal_cache_hit_ratio", round(stats["hit_rate"], 4),
+                          cache=name)
+
+
+def metrics_text():
+    # Prometheus exposition for the /metrics endpoint
+    _refresh_cache_gauges()
+    return metrics.render_prometheus()
+
+
+def metrics_snapshot():
+    _refresh_cache_gauges()
+    return {
+        "stages": metrics.stage_summary(),
+        "recent": metrics.recent(),
+        "caches": {
+            "embedding": embed_model.stats(),
+            "response": response_cache.stats(),
+            "index": index_cache.stats(),
+        },
+    }
+
+
+def embedding_cache_stats():
+    return embed_model.stats()
+
+
+# 📚 Persistent corpus index: many documents, searchable by metadata + vector.
+# Opened on the first corpus call: loading every vector and keyword posting
+# is only worth it in processes that actually use the corpus.
+CORPUS_DIR = os.environ.get("LEGAL_CORPUS_DIR", "corpus")
+_corpus = None
+_corpus_lock = threading.Lock()
 
 
-def save_to_log(filename, category, content):
-    os.makedirs("logs", exist_ok=True)
-    log_path = os.path.join("logs", "session_log.csv")
-    header = ["timestamp", "filename", "category", "content"]
+def get_corpus():
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = CorpusIndex(CORPUS_DIR)
+        return _corpus
 
-    if not os.path.exists(log_path):
-        with open(log_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
 
-    with open(log_path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([datetime.now().isoformat(),
-                        filename, category, content])
+def add_to_corpus(documents, user=None, doc_type=None):
+    """Embed a document clause by clause into the corpus; no-op if present."""
+    doc_hash = _doc_hash(documents)
+    corpus = get_corpus()
+    if doc_hash in corpus:
+        return doc_hash
+    text = "\n".join(doc.text for doc in documents)
+    names = [doc.metadata.get("file_name") for doc in documents]
+    clauses = [c for c in split_clauses(text, max_tokens=CHUNK_SIZE) if c["text"].strip()]
+    with metrics.timed("corpus_add"):
+        vectors = embed_model.get_text_embedding_batch([c["text"] for c in clauses])
+        tags = clause_classifier.classify(vectors)
+        chunks = [{"text": c["text"], "section": section_label(c),
+                   "clause_category": (c["kind"].title() if c["kind"] in STRUCTURAL_KINDS
+                                       else category),
+                   "start_char_idx": c["start"], "end_char_idx": c["end"]}
+                  for c, (category, _) in zip(clauses, tags)]
+        corpus.add(doc_hash, chunks, vectors,
+                   filename=next((n for n in names if n), None),
+                   user=user or current_user.get(),
+                   doc_type=doc_type or guess_doc_type(text))
+    return doc_hash
 
 
-def summarize_document(documents):
+def remove_from_corpus(doc_hash):
+    return get_corpus().remove(doc_hash)
+
+
+def search_corpus(query, top_k=10, per_document=False, min_score=None, hybrid=True,
+                  **filters):
+    """Corpus-wide search (vector + BM25 unless hybrid=False); filters
+    (filename, user, doc_type, clause_category, doc_hash) apply before scoring."""
+    with metrics.timed("corpus_search"):
+        vector = embed_model.get_query_embedding(query)
+        return get_corpus().search(
+            vector, top_k=top_k, per_document=per_document, min_score=min_score,
+            query_text=query if hybrid else None, **filters)
+
+
+def corpus_documents(**filters):
+    return get_corpus().documents(**filters)
+
+
+# 🗃️ Queryable analysis log (SQLite, written off the request path)
+log_store = LogStore()
+
+
+def set_current_user(user):
+    current_user.set(user)
+
+
+def save_to_log(filename, category, content, doc_hash=None, user=None,
+                latency_ms=None, prompt_tokens=None, completion_tokens=None,
+                session_id=None):
+    log_store.log(category, content, doc_hash=doc_hash, user=user,
+                  filename=filename, latency_ms=latency_ms,
+                  prompt_tokens=prompt_tokens,
+                  completion_tokens=completion_tokens, session_id=session_id)
+
+
+def _log_result(documents, category, content, started, prompt_text="", user=None,
+                session_id=None):
+    names = [doc.metadata.get("file_name") for doc in documents or []]
+    filename = ", ".join(dict.fromkeys(n for n in names if n)) or "uploaded"
+    save_to_log(
+        filename, category, content,
+        doc_hash=_doc_hash(documents) if documents else None,
+        user=user,
+        latency_ms=round((time.perf_counter() - started) * 1000, 1),
+        prompt_tokens=estimate_tokens(prompt_text),
+        completion_tokens=estimate_tokens(content),
+        session_id=session_id,
+    )
+
+
+def log_history(**filters):
+    return log_store.history(**filters)
+
+
+def log_stats(group_by="category", **filters):
+    return log_store.stats(group_by, **filters)
+
+
+def _summary_input(documents, mode):
+    # Returns (error message, text, resolved mode)
     if not documents:
-        return "⚠️ No document to summarize. Please upload a valid file."
+        return "⚠️ No document to summarize. Please upload a valid file.", None, mode
 
-    text = documents[0].text.strip()
+    text = "\n".join(doc.text for doc in documents).strip()
     if not text:
-        return "⚠️ Document is empty."
+        return "⚠️ Document is empty.", None, mode
+
+    if mode == "auto":
+        mode = "single" if len(text) <= SINGLE_PASS_CHARS else "map_reduce"
+    return None, text, mode
+
+
+def _single_pass_prompt(text):
+    return prompts["summarize"].format(content=text[:SINGLE_PASS_CHARS])
 
-    short_text = text[:12000]  # approx first 3000 tokens
 
-    prompt = prompts["summarize"].format(content=short_text)
+def _finish_summary(documents, summary, started, prompt_text):
+    summary = summary.strip()
+    if not summary:
+        print("⚠️ Empty summary returned.")
+        return "⚠️ The AI returned an empty summary. Try again or check the document content."
+    print("✅ Summary received.")
+    _log_result(documents, "summary", summary, started, prompt_text)
+    return summary
+
+
+def summarize_document(documents, mode="auto"):
+    # mode: "auto" (map-reduce only when needed), "single" or "map_reduce"
+    started = time.perf_counter()
+    error, text, mode = _summary_input(documents, mode)
+    if error:
+        return error
 
     try:
         print("🔍 Sending prompt to LLM...")
-        summary = llm.complete(prompt).text.strip()
-        if not summary:
-            print("⚠️ Empty summary returned.")
-            return "⚠️ The AI returned an empty summary. Try again or check the document content."
-        print("✅ Summary received.")
-        save_to_log("uploaded", "summary", summary)
-        return summary
+        if mode == "map_reduce":
+            summary = summarizer.summarize(text)
+        else:
+            text = _single_pass_prompt(text)
+            summary = _complete_text(text, _doc_hash(documents))
+        return _finish_summary(documents, summary, started, text)
     except Exception as e:
         print("❌ Summarization Error:", e)
         return f"❌ Summarization failed: {e}"
 
 
-def highlight_clauses(documents):
-    if not documents:
-        return "⚠️ No document to analyze. Please upload a valid file."
+def _sent_text(prompt, response):
+    # What the query engine actually put in front of the LLM
+    context = [n.node.get_content() for n in getattr(response, "source_nodes", [])]
+    return "\n".join([prompt, *context])
+
+
+def _query_index(documents, index, prompt, category):
+    started = time.perf_counter()
+    key = _query_key(documents, prompt)
+    result = response_cache.get(key)
+    sent = prompt
+    if result is None:
+        if index is None:
+            index = build_index(documents)
+        with metrics.timed("query_engine", analysis=category):
+            response = _query_engine(index).query(prompt)
+        result, sent = str(response), _sent_text(prompt, response)
+        _count_tokens(sent, result)
+        response_cache.put(key, result)
+    _log_result(documents, category, result, started, sent)
+    return result
+
 
-    index = build_index(documents)
-    prompt = prompts["highlight"]  # 🔑 Load the prompt from prompts.json
+# 📌 Highlights: clauses are tagged locally, the LLM only explains them
+HIGHLIGHT_SKIP = ("Other", "Preamble", "Recital", "Signature")
+HIGHLIGHT_PER_CATEGORY = 4
+HIGHLIGHT_CATEGORY_TOKENS = 1200
 
-    response = index.as_query_engine().query(prompt)
-    clauses = str(response)
-    save_to_log("uploaded", "highlighted_clauses", clauses)
-    return clauses
 
+def _node_embeddings(index):
+    # The simple vector store keeps every node's vector; reuse them
+    data = getattr(index.vector_store, "data", None)
+    return dict(getattr(data, "embedding_dict", None) or {})
 
-def clause_breakdown(documents):
+
+def clause_map(documents, index=None, categories=None):
+    """Every indexed clause with its local category tag, in document order."""
+    if index is None:
+        index = build_index(documents)
+    nodes = list(index.docstore.docs.values())
+    vectors = _node_embeddings(index)
+    missing = [node for node in nodes if node.node_id not in vectors]
+    if missing:
+        vectors.update(zip([node.node_id for node in missing],
+                           embed_model.get_text_embedding_batch(
+                               [node.get_content() for node in missing])))
+    with metrics.timed("clause_classify"):
+        tags = clause_classifier.classify([vectors[node.node_id] for node in nodes])
+
+    entries = []
+    for node, (category, score) in zip(nodes, tags):
+        kind = node.metadata.get("clause_kind")
+        if kind in STRUCTURAL_KINDS:
+            category = kind.title()
+        if categories and category not in categories:
+            continue
+        entries.append({"node_id": node.node_id, "category": category, "score": score,
+                        "section": node.metadata.get("section"),
+                        "heading": node.metadata.get("heading"), "kind": kind,
+                        "start": node.start_char_idx, "end": node.end_char_idx,
+                        "text": node.get_content()})
+    return entries
+
+
+def _highlight_groups(entries):
+    # Best-matching clauses per category, shown in document order
+    groups = {}
+    for position, entry in enumerate(entries):
+        if entry["category"] not in HIGHLIGHT_SKIP:
+            groups.setdefault(entry["category"], []).append((position, entry))
+    order = {label: i for i, label in enumerate(clause_classifier.seeds)}
+    return {
+        category: [e for _, e in sorted(
+            sorted(items, key=lambda item: -item[1]["score"])[:HIGHLIGHT_PER_CATEGORY],
+            key=lambda item: item[0])]
+        for category, items in sorted(groups.items(), key=lambda g: order.get(g[0], len(order)))
+    }
+
+
+def _highlight_prompt(category, items):
+    texts = fit_to_budget([f"[{e['section']}] {e['text']}" for e in items],
+                          HIGHLIGHT_CATEGORY_TOKENS)
+    return prompts["highlight_category"].format(category=category, clauses="\n\n".join(texts))
+
+
+def _highlight_header(category, items):
+    sections = ", ".join(dict.fromkeys(e["section"] for e in items if e["section"]))
+    return f"### {category}\n_{sections}_\n\n"
+
+
+def highlight_clauses(documents, index=None):
+    if not documents:
+        return "⚠️ No document to analyze. Please upload a valid file."
+    started = time.perf_counter()
+    groups = _highlight_groups(clause_map(documents, index))
+    if not groups:
+        return "No key clauses found in this document."
+    # 🔑 Load the prompt from prompts.json
+    prompt_texts = {c: _highlight_prompt(c, items) for c, items in groups.items()}
+    doc_hash = _doc_hash(documents)
+    with ThreadPoolExecutor(max_workers=MAX_LLM_INFLIGHT) as pool:
+        futures = {c: pool.submit(contextvars.copy_context().run, _complete_text, p, doc_hash)
+                   for c, p in prompt_texts.items()}
+        result = "\n\n".join(_highlight_header(c, groups[c]) + futures[c].result().strip()
+                              for c in groups)
+    _log_result(documents, "highlighted_clauses", result, started,
+                "\n".join(prompt_texts.values()))
+    return result
+
+
+def clause_breakdown(documents, index=None, incremental=False):
     if not documents:
         return "⚠️ No document available for clause breakdown."
+    if incremental:
+        return format_clause_breakdown(incremental_clause_breakdown(documents))
+    return _query_index(documents, index, prompts["breakdown"], "clause_breakdown")
 
-    index = build_index(documents)
-    prompt = prompts["breakdown"]  # 🔑 Load prompt from JSON
-    response = index.as_query_engine().query(prompt)
 
-    breakdown = str(response)
-    save_to_log("uploaded", "clause_breakdown", breakdown)
-    return breakdown
+# ✏️ Revision-aware breakdown: only added/modified clauses go to the LLM
+clause_store = ClauseStore()
 
 
-def simplify_legal_jargon(documents):
-    if not documents:
-        return "⚠️ No document to simplify."
+def _clause_explanation_version():
+    return content_hash(llm.model, prompts["breakdown_clause"],
+                        prompts["breakdown_clause_revised"], CHUNKER_VERSION)
 
-    index = build_index(documents)
-    prompt = prompts["simplify"]  # 🔑 Load prompt from JSON
-    response = index.as_query_engine().query(prompt)
 
-    simplified = str(response)
-    save_to_log("uploaded", "simplified", simplified)
-    return simplified
+def _explain_clause(clause, previous=None):
+    if clause["kind"] == "signature":
+        return "Signature block: where the parties sign and date the agreement."
+    if previous is None:
+        prompt = prompts["breakdown_clause"].format(
+            section=clause["section"], clause=clause["text"])
+    else:
+        prompt = prompts["breakdown_clause_revised"].format(
+            section=clause["section"], previous=previous["text"], clause=clause["text"])
+    return _complete_text(prompt).strip()
 
 
-def answer_query(documents, query):
-    global chat_history
-    combined_text = "\n".join(
-        [doc.text for doc in documents if doc.text.strip()])
-    if not combined_text.strip():
-        combined_text = "No usable text found in the uploaded document."
+def incremental_clause_breakdown(documents, family=None):
+    """Per-clause breakdown that reuses explanations from earlier revisions.
 
-    history = "\n".join([f"User: {q}\nAI: {a}" for q, a in chat_history])
+    Clauses are aligned to the last analyzed revision of the same document
+    family (by default the file name without version suffixes) by content
+    hash, then by fuzzy match; only added or modified clauses are explained
+    by the LLM. Returns the clauses in document order plus the diff counts.
+    """
+    started = time.perf_counter()
+    text = "\n".join(doc.text for doc in documents)
+    if family is None:
+        names = [doc.metadata.get("file_name") for doc in documents]
+        family = document_family(next((n for n in names if n), "document"))
+    doc_hash = _doc_hash(documents)
+    version = _clause_explanation_version()
 
-    # 🔑 Use a structured prompt template from JSON
-    base_prompt = prompts.get("qa", """
+    with metrics.timed("clause_alignment"):
+        clauses = []
+        for clause in split_clauses(text, max_tokens=CHUNK_SIZE):
+            if clause["text"].strip():
+                clauses.append({"text": clause["text"], "kind": clause["kind"],
+                                "section": section_label(clause),
+                                "hash": clause_hash(clause["text"])})
+        _, old_hashes = clause_store.latest_revision(family, exclude_doc=doc_hash)
+        stored = clause_store.explanations(
+            {c["hash"] for c in clauses} | set(old_hashes), version)
+        old_clauses = [{"hash": h, **stored[h]} for h in old_hashes if h in stored]
+        pairs, removed = align_clauses(clauses, old_clauses)
+
+    todo = []
+    for clause, (status, j) in zip(clauses, pairs):
+        clause["status"] = status
+        if clause["hash"] in stored:
+            # Same text seen before (this or another revision): no LLM call
+            clause["explanation"] = stored[clause["hash"]]["explanation"]
+            clause["reused"] = True
+        else:
+            clause["reused"] = False
+            todo.append((clause, old_clauses[j] if status == "modified" else None))
+
+    with ThreadPoolExecutor(max_workers=MAX_LLM_INFLIGHT) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _explain_clause, c, prev)
+                   for c, prev in todo]
+        for (clause, _), future in zip(todo, futures):
+            clause["explanation"] = future.result()
+
+    clause_store.save_explanations(
+        [(c["hash"], c["section"], c["text"], c["explanation"])
+         for c, _ in todo if c["explanation"]], version)
+    clause_store.save_revision(family, doc_hash, [c["hash"] for c in clauses])
+    metrics.inc("legal_clause_explanations_total", len(todo), source="llm")
+    metrics.inc("legal_clause_explanations_total", len(clauses) - len(todo), source="reused")
+
+    counts = {status: sum(c["status"] == status for c in clauses)
+              for status in ("unchanged", "modified", "added")}
+    counts["removed"] = len(removed)
+    counts["llm_calls"] = len(todo)
+    result = {"family": family, "clauses": clauses, "counts": counts,
+              "removed": [old_clauses[j]["section"] for j in removed]}
+    _log_result(documents, "clause_breakdown", format_clause_breakdown(result), started,
+                "\n".join(c["text"] for c, _ in todo))
+    return result
+
+
+def format_clause_breakdown(result):
+    badges = {"unchanged": "", "modified": " ✏️ *changed*", "added": " ➕ *new*"}
+    counts = result["counts"]
+    lines = [f"**{counts['unchanged']} unchanged, {counts['modified']} modified, "
+             f"{counts['added']} added, {counts['removed']} removed** "
+             f"({counts['llm_calls']} clauses sent to the AI)", ""]
+    for clause in result["clauses"]:
+        lines += [f"#### {clause['section']}{badges[clause['status']]}",
+                  clause["explanation"], ""]
+    if result["removed"]:
+        lines += ["#### ➖ Removed since the previous revision",
+                  *[f"- {section}" for section in result["removed"]]]
+    return "\n".join(lines).strip()
+
+
+def simplify_legal_jargon(documents, index=None):
+    if not documents:
+        return "⚠️ No document to simplify."
+    return _query_index(documents, index, prompts["simplify"], "simplified")
+
+
+QA_PROMPT = """
 You are a helpful AI with expertise in legal and general questions.
 Always answer clearly, even if the question is not related to any document.
 
-Uploaded Document:
+Relevant Excerpts from the Uploaded Document:
 {document}
 
 Chat History:
 {history}
 
 User: {query}
-AI:""").strip()
+AI:"""
 
-    prompt = base_prompt.format(
-        document=combined_text[:2000],
+
+def _qa_prompt(nodes, query, session_id):
+    excerpts = fit_to_budget(
+        [n.node.get_content() for n in nodes if n.node.get_content().strip()],
+        QA_CONTEXT_TOKENS)
+    context = "\n---\n".join(excerpts)
+    if not context.strip():
+        context = "No usable text found in the uploaded document."
+
+    # Most recent turns win the history budget, then go back in order
+    summary, past_turns = sessions.get(session_id)
+    turns = [f"User: {q}\nAI: {a}" for q, a in reversed(past_turns)]
+    if summary:
+        turns.append(f"Earlier conversation (summary): {summary}")
+    history = "\n".join(reversed(fit_to_budget(turns, QA_HISTORY_TOKENS)))
+
+    # 🔑 Use a structured prompt template from JSON
+    base_prompt = prompts.get("qa", QA_PROMPT).strip()
+
+    return base_prompt.format(
+        document=context,
         history=history,
         query=query
     )
 
-    response = llm.complete(prompt).text.strip()
-    chat_history.append((query, response))
-    save_to_log("uploaded", "qa", f"Q: {query}\nA: {response}")
+
+def _record_answer(documents, query, response, session_id, started, prompt):
+    sessions.append(session_id, query, response)
+    # The user comes from current_user like every other analysis; the
+    # conversation id gets its own column
+    _log_result(documents, "qa", f"Q: {query}\nA: {response}", started,
+                prompt, session_id=session_id)
     return response
 
 
-def extract_entities(documents):
+def answer_query(documents, query, index=None, session_id="default"):
+    started = time.perf_counter()
+    nodes = []
+    if documents:
+        if index is None:
+            index = build_index(documents)
+        with metrics.timed("retrieval"):
+            nodes = _retriever(index, QA_TOP_K).retrieve(query)
+    prompt = _qa_prompt(nodes, query, session_id)
+    response = _complete_text(prompt, _doc_hash(documents)).strip()
+    return _record_answer(documents, query, response, session_id, started, prompt)
+
+
+# 🏷️ Entities: compiled rules for dates, amounts, terms...; the LLM only
+# names people, organizations and places from a few relevant excerpts
+ENTITY_LLM_FALLBACK = os.environ.get("LEGAL_ENTITY_LLM_FALLBACK", "1") == "1"
+ENTITY_LLM_TOKENS = 1500
+ENTITY_LIST_LIMIT = 50  # distinct values shown per category
+# Clauses that carry names and addresses; a heading check, not a category
+ENTITY_EXCERPT_KINDS = ("preamble", "signature")
+NOTICES_HEADING = re.compile(r"\bnotices?\b", re.IGNORECASE)
+ENTITY_LABELS = {
+    "parties": "🤝 Parties",
+    "dates": "📅 Dates",
+    "amounts": "💰 Amounts",
+    "percentages": "📈 Percentages",
+    "durations": "⏳ Durations",
+    "defined_terms": "📖 Defined Terms",
+    "section_refs": "🔗 Section References",
+}
+
+
+def rule_entities(documents):
+    """Rule-based entities with character offsets and their clause section."""
+    text = "\n".join(doc.text for doc in documents)
+    clauses = split_clauses(text, max_tokens=CHUNK_SIZE)
+    with metrics.timed("entity_rules"):
+        found = extract_rule_entities(text, [(c["start"], section_label(c)) for c in clauses])
+    return found, clauses
+
+
+def _entities_prompt(found, clauses):
+    # Names and addresses live in the preamble, notices and signature blocks
+    excerpts = [c["text"] for c in clauses
+                if c["kind"] in ENTITY_EXCERPT_KINDS or NOTICES_HEADING.search(c.get("heading") or "")]
+    excerpts = excerpts or [c["text"] for c in clauses[:3]]
+    parties = ", ".join(f"{p['text']} ({p['role']})" if p["role"] else p["text"]
+                        for p in found["parties"]) or "not identified"
+    return prompts["entities"].format(
+        parties=parties, content="\n\n".join(fit_to_budget(excerpts, ENTITY_LLM_TOKENS)))
+
+
+def format_entities(found, llm_text=None):
+    lines = []
+    for category, label in ENTITY_LABELS.items():
+        items = found.get(category) or []
+        if not items:
+            continue
+        lines.append(f"### {label}")
+        if category == "parties":
+            lines += [f"- **{p['text']}**" + (f" — “{p['role']}”" if p["role"] else "")
+                      for p in items]
+        else:
+            values = unique_values(items, key="term" if category == "defined_terms" else "text")
+            lines += [f"- {value}" + (f" (×{count})" if count > 1 else "")
+                      for value, count in values[:ENTITY_LIST_LIMIT]]
+            if len(values) > ENTITY_LIST_LIMIT:
+                lines.append(f"- … and {len(values) - ENTITY_LIST_LIMIT} more")
+        lines.append("")
+    if llm_text:
+        lines += ["### 🧾 People, Organizations & Locations", llm_text]
+    return "\n".join(lines).strip() or "No entities found."
+
+
+def extract_entities_structured(documents, llm_fallback=ENTITY_LLM_FALLBACK):
+    """{"rules": {category: [{text, start, end, section, ...}]}, "llm": str|None}"""
+    started = time.perf_counter()
+    found, clauses = rule_entities(documents)
+    prompt, llm_text = "", None
+    if llm_fallback:
+        prompt = _entities_prompt(found, clauses)
+        llm_text = _complete_text(prompt, _doc_hash(documents)).strip()
+    _log_result(documents, "entities", format_entities(found, llm_text), started, prompt)
+    return {"rules": found, "llm": llm_text}
+
+
+def extract_entities(documents, index=None):
     if not documents:
         return "⚠️ No document to extract entities from."
-    index = build_index(documents)
-    prompt = prompts.get(
-        "entities", "Extract all named entities from this legal document. Categorize them into: People, Organizations, Dates, Locations, Legal Terms.")
-    response = index.as_query_engine().query(prompt)
-    entities = str(response)
-    save_to_log("uploaded", "entities", entities)
-    return entities
+    result = extract_entities_structured(documents)
+    return format_entities(result["rules"], result["llm"])
+
+
+# ⚖️ Comparison: align clauses by embedding, diff locally, LLM only on changes
+COMPARE_MIN_SIMILARITY = 0.75
+COMPARE_MAX_LLM_PAIRS = 40  # bounds LLM time for very different documents
+
+
+def _document_clauses(documents):
+    text = "\n".join(doc.text for doc in documents)
+    return [{"text": c["text"], "section": section_label(c), "hash": clause_hash(c["text"])}
+            for c in split_clauses(text, max_tokens=CHUNK_SIZE)
+            if c["kind"] != "signature" and c["text"].strip()]
+
+
+def _explain_difference(left, right, diff):
+    prompt = prompts["compare_clause"].format(
+        section_1=left["section"], clause_1=left["text"],
+        section_2=right["section"], clause_2=right["text"], diff=diff)
+    return _complete_text(prompt).strip()
+
+
+def align_documents(doc1, doc2):
+    """Clause-level comparison of two documents.
+
+    Both sides are split into clauses, embedded with the shared (cached)
+    embedding model and paired one-to-one on cosine similarity. Pairs are
+    diffed locally; only pairs that actually differ go to the LLM, most
+    different first and at most COMPARE_MAX_LLM_PAIRS of them.
+    """
+    started = time.perf_counter()
+    with metrics.timed("clause_alignment"):
+        left, right = _document_clauses(doc1), _document_clauses(doc2)
+        vectors = embed_model.get_text_embedding_batch(
+            [c["text"] for c in left + right])
+        sim = similarity_matrix(vectors[:len(left)], vectors[len(left):])
+        pairs = assign(sim, COMPARE_MIN_SIMILARITY)
+
+    matched, changed = [], []
+    for i, j, score in pairs:
+        pair = {"left": left[i], "right": right[j], "similarity": round(score, 3),
+                "diff": "", "explanation": None}
+        if left[i]["hash"] != right[j]["hash"]:
+            pair["diff"] = word_diff(left[i]["text"], right[j]["text"])
+        matched.append(pair)
+        if pair["diff"]:
+            changed.append(pair)
+
+    changed.sort(key=lambda p: diff_ratio(p["left"]["text"], p["right"]["text"]))
+    to_explain = changed[:COMPARE_MAX_LLM_PAIRS]
+    with ThreadPoolExecutor(max_workers=MAX_LLM_INFLIGHT) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _explain_difference,
+                               p["left"], p["right"], p["diff"]) for p in to_explain]
+        for pair, future in zip(to_explain, futures):
+            pair["explanation"] = future.result()
+
+    paired_left = {i for i, _, _ in pairs}
+    paired_right = {j for _, j, _ in pairs}
+    result = {
+        "matched": matched,
+        "only_in_1": [c for i, c in enumerate(left) if i not in paired_left],
+        "only_in_2": [c for j, c in enumerate(right) if j not in paired_right],
+        "counts": {"identical": len(matched) - len(changed), "changed": len(changed),
+                   "only_in_1": len(left) - len(paired_left),
+                   "only_in_2": len(right) - len(paired_right),
+                   "llm_calls": len(to_explain)},
+    }
+    _log_result(doc1 + doc2, "comparison", format_comparison(result), started,
+                "\n".join(p["left"]["text"] + "\n" + p["right"]["text"] for p in to_explain))
+    return result
+
+
+def _preview(text, limit=200):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+def format_comparison(result):
+    counts = result["counts"]
+    lines = [f"**{counts['identical']} identical, {counts['changed']} changed, "
+             f"{counts['only_in_1']} only in Document 1, {counts['only_in_2']} only in Document 2**", ""]
+    changed = [p for p in result["matched"] if p["diff"]]
+    if changed:
+        lines.append("### ✏️ Changed clauses")
+    for pair in changed:
+        lines += [f"#### {pair['left']['section']} ↔ {pair['right']['section']}",
+                  pair["explanation"] or f"`{_preview(pair['diff'], 400)}`", ""]
+    for key, title in (("only_in_1", "Only in Document 1"), ("only_in_2", "Only in Document 2")):
+        if result[key]:
+            lines.append(f"### ➖ {title}" if key == "only_in_1" else f"### ➕ {title}")
+            lines += [f"- **{c['section']}**: {_preview(c['text'])}" for c in result[key]]
+            lines.append("")
+    return "\n".join(lines).strip()
 
 
 def compare_documents(doc1, doc2):
     if not doc1 or not doc2:
         return "⚠️ Both documents must be uploaded for comparison."
+    return format_comparison(align_documents(doc1, doc2))
+
+
+# 🧮 Single-pass engine: one index, all analyses dispatched concurrently
+ANALYSES = {
+    "summary": lambda documents, index: summarize_document(documents),
+    "clauses": highlight_clauses,
+    "breakdown": clause_breakdown,
+    "simplify": simplify_legal_jargon,
+    "entities": extract_entities,
+}
+
+
+def analyze_document(documents, analyses=None):
+    analyses = list(dict.fromkeys(analyses or ANALYSES))
+    unknown = [name for name in analyses if name not in ANALYSES]
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(unknown)}")
+    if not documents:
+        return {"error": "⚠️ No document to analyze. Please upload a valid file."}
+
+    start = time.perf_counter()
+    # Summary works on raw text; everything else shares one index
+    index = None
+    if any(name != "summary" for name in analyses):
+        index = build_index(documents)
+    index_seconds = time.perf_counter() - start
+
+    def run(name):
+        t0 = time.perf_counter()
+        result = ANALYSES[name](documents, index=index)
+        return result, time.perf_counter() - t0
+
+    results, errors, timings = {}, {}, {}
+    with ThreadPoolExecutor(max_workers=len(analyses)) as pool:
+        # Each task carries the caller's context (e.g. current_user for logs)
+        futures = {name: pool.submit(contextvars.copy_context().run, run, name)
+                   for name in analyses}
+        for name, future in futures.items():
+            try:
+                results[name], timings[name] = future.result()
+            except Exception as e:
+                print(f"❌ {name} failed:", e)
+                errors[name] = str(e)
+
+    return {
+        "results": results,
+        "errors": errors,
+        "timings": {
+            "index": round(index_seconds, 3),
+            **{name: round(t, 3) for name, t in timings.items()},
+            "total": round(time.perf_counter() - start, 3),
+        },
+    }
+
+
+# ⚡ Async variants: LLM calls use the async Ollama client, CPU work the worker pool
+async def _in_worker(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    return await loop.run_in_executor(
+        worker_pool, functools.partial(contextvars.copy_context().run, call))
+
+
+async def aload_document(file_path):
+    return await _in_worker(load_document, file_path)
+
+
+async def abuild_index(documents):
+    return await _in_worker(build_index, documents)
+
+
+async def aadd_to_corpus(documents, user=None, doc_type=None):
+    return await _in_worker(add_to_corpus, documents, user, doc_type)
+
+
+async def asummarize_document(documents, mode="auto"):
+    started = time.perf_counter()
+    error, text, mode = _summary_input(documents, mode)
+    if error:
+        return error
+
+    try:
+        print("🔍 Sending prompt to LLM...")
+        if mode == "map_reduce":
+            summary = await summarizer.asummarize(text)
+        else:
+            text = _single_pass_prompt(text)
+            summary = await _acomplete_text(text, _doc_hash(documents))
+        return _finish_summary(documents, summary, started, text)
+    except Exception as e:
+        print("❌ Summarization Error:", e)
+        return f"❌ Summarization failed: {e}"
+
+
+async def _aquery_index(documents, index, prompt, category):
+    started = time.perf_counter()
+    key = _query_key(documents, prompt)
+    result = await _in_worker(response_cache.get, key)
+    sent = prompt
+    if result is None:
+        if index is None:
+            index = await abuild_index(documents)
+        # Retrieval (query embedding + BM25) runs in the worker pool; only
+        # the Ollama call is awaited on the loop
+        engine, query = _query_engine(index), QueryBundle(prompt)
+        with metrics.timed("query_engine", analysis=category):
+            nodes = await _in_worker(engine.retrieve, query)
+            response = await engine.asynthesize(query, nodes)
+        result, sent = str(response), _sent_text(prompt, response)
+        _count_tokens(sent, result)
+        await _in_worker(response_cache.put, key, result)
+    _log_result(documents, category, result, started, sent)
+    return result
+
+
+async def ahighlight_clauses(documents, index=None):
+    if not documents:
+        return "⚠️ No document to analyze. Please upload a valid file."
+    started = time.perf_counter()
+    if index is None:
+        index = await abuild_index(documents)
+    groups = _highlight_groups(await _in_worker(clause_map, documents, index))
+    if not groups:
+        return "No key clauses found in this document."
+    prompt_texts = {c: _highlight_prompt(c, items) for c, items in groups.items()}
+    doc_hash = _doc_hash(documents)
+    answers = await asyncio.gather(
+        *[_acomplete_text(p, doc_hash) for p in prompt_texts.values()])
+    result = "\n\n".join(_highlight_header(c, groups[c]) + answer.strip()
+                          for c, answer in zip(groups, answers))
+    _log_result(documents, "highlighted_clauses", result, started,
+                "\n".join(prompt_texts.values()))
+    return result
+
+
+async def aclause_breakdown(documents, index=None):
+    if not documents:
+        return "⚠️ No document available for clause breakdown."
+    return await _aquery_index(documents, index, prompts["breakdown"], "clause_breakdown")
+
+
+async def asimplify_legal_jargon(documents, index=None):
+    if not documents:
+        return "⚠️ No document to simplify."
+    return await _aquery_index(documents, index, prompts["simplify"], "simplified")
+
+
+async def aextract_entities(documents, index=None):
+    if not documents:
+        return "⚠️ No document to extract entities from."
+    started = time.perf_counter()
+    found, clauses = await _in_worker(rule_entities, documents)
+    prompt, llm_text = "", None
+    if ENTITY_LLM_FALLBACK:
+        prompt = _entities_prompt(found, clauses)
+        llm_text = (await _acomplete_text(prompt, _doc_hash(documents))).strip()
+    result = format_entities(found, llm_text)
+    _log_result(documents, "entities", result, started, prompt)
+    return result
+
+
+async def aanswer_query(documents, query, index=None, session_id="default"):
+    started = time.perf_counter()
+    nodes = []
+    if documents:
+        if index is None:
+            index = await abuild_index(documents)
+        with metrics.timed("retrieval"):
+            nodes = await _in_worker(_retriever(index, QA_TOP_K).retrieve, query)
+    prompt = await _in_worker(_qa_prompt, nodes, query, session_id)
+    response = (await _acomplete_text(prompt, _doc_hash(documents))).strip()
+    # Session writes (and optional compaction) stay off the event loop
+    return await _in_worker(_record_answer, documents, query, response,
+                            session_id, started, prompt)
+
+
+ASYNC_ANALYSES = {
+    "summary": lambda documents, index: asummarize_document(documents),
+    "clauses": ahighlight_clauses,
+    "breakdown": aclause_breakdown,
+    "simplify": asimplify_legal_jargon,
+    "entities": aextract_entities,
+}
+
+
+async def aanalyze_document(documents, analyses=None):
+    analyses = list(dict.fromkeys(analyses or ASYNC_ANALYSES))
+    unknown = [name for name in analyses if name not in ASYNC_ANALYSES]
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(unknown)}")
+    if not documents:
+        return {"error": "⚠️ No document to analyze. Please upload a valid file."}
+
+    start = time.perf_counter()
+    index = None
+    if any(name != "summary" for name in analyses):
+        index = await abuild_index(documents)
+    index_seconds = time.perf_counter() - start
+
+    async def run(name):
+        t0 = time.perf_counter()
+        result = await ASYNC_ANALYSES[name](documents, index=index)
+        return result, time.perf_counter() - t0
+
+    outcomes = await asyncio.gather(
+        *[run(name) for name in analyses], return_exceptions=True)
+
+    results, errors, timings = {}, {}, {}
+    for name, outcome in zip(analyses, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"❌ {name} failed:", outcome)
+            errors[name] = str(outcome)
+        else:
+            results[name], timings[name] = outcome
+
+    return {
+        "results": results,
+        "errors": errors,
+        "timings": {
+            "index": round(index_seconds, 3),
+            **{name: round(t, 3) for name, t in timings.items()},
+            "total": round(time.perf_counter() - start, 3),
+        },
+    }
+
+
+# 🌊 Streaming variants: yield text deltas as Ollama produces them
+def stream_summarize_document(documents, mode="auto"):
+    started = time.perf_counter()
+    error, text, mode = _summary_input(documents, mode)
+    if error:
+        yield error
+        return
+
+    try:
+        print("🔍 Streaming prompt to LLM...")
+        if mode == "map_reduce":
+            # Sections are summarized up front; only the final merge streams.
+            # Keyed like the summarizer's own calls, so a merge already done
+            # by summarize_document comes straight from the response cache.
+            prompt = summarizer.final_prompt(summarizer.reduce_input(text))
+            doc_hash = None
+        else:
+            prompt = _single_pass_prompt(text)
+            doc_hash = _doc_hash(documents)
+
+        parts = []
+        for delta in _stream_complete(prompt, doc_hash):
+            parts.append(delta)
+            yield delta
+
+        raw = "".join(parts)
+        summary = _finish_summary(documents, raw, started, prompt)
+        if not raw.strip():
+            yield summary  # the empty-summary warning
+    except Exception as e:
+        print("❌ Summarization Error:", e)
+        yield f"❌ Summarization failed: {e}"
+
+
+def _stream_query_index(documents, index, prompt, category):
+    started = time.perf_counter()
+    key = _query_key(documents, prompt)
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        _log_result(documents, category, cached, started, prompt)
+        return
+
+    if index is None:
+        index = build_index(documents)
+    with metrics.timed("query_engine", analysis=category):
+        response = _query_engine(index, streaming=True).query(prompt)
+        parts = []
+        for token in response.response_gen:
+            parts.append(token)
+            yield token
+    result = "".join(parts)
+    _count_tokens(_sent_text(prompt, response), result)
+    response_cache.put(key, result)
+    _log_result(documents, category, result, started,
+                _sent_text(prompt, response))
+
+
+def stream_highlight_clauses(documents, index=None):
+    if not documents:
+        yield "⚠️ No document to analyze. Please upload a valid file."
+        return
+    started = time.perf_counter()
+    groups = _highlight_groups(clause_map(documents, index))
+    if not groups:
+        yield "No key clauses found in this document."
+        return
+    doc_hash, parts, sent = _doc_hash(documents), [], []
+    for i, (category, items) in enumerate(groups.items()):
+        header = ("\n\n" if i else "") + _highlight_header(category, items)
+        parts.append(header)
+        yield header
+        prompt = _highlight_prompt(category, items)
+        sent.append(prompt)
+        for delta in _stream_complete(prompt, doc_hash):
+            parts.append(delta)
+            yield delta
+    _log_result(documents, "highlighted_clauses", "".join(parts), started, "\n".join(sent))
+
+
+def stream_clause_breakdown(documents, index=None):
+    if not documents:
+        yield "⚠️ No document available for clause breakdown."
+        return
+    yield from _stream_query_index(documents, index, prompts["breakdown"], "clause_breakdown")
+
+
+def stream_simplify_legal_jargon(documents, index=None):
+    if not documents:
+        yield "⚠️ No document to simplify."
+        return
+    yield from _stream_query_index(documents, index, prompts["simplify"], "simplified")
+
+
+def stream_extract_entities(documents, index=None):
+    if not documents:
+        yield "⚠️ No document to extract entities from."
+        return
+    started = time.perf_counter()
+    found, clauses = rule_entities(documents)
+    # Rule results are instant; only the names section streams from the LLM
+    parts = [format_entities(found)]
+    yield parts[0]
+    prompt = ""
+    if ENTITY_LLM_FALLBACK:
+        prompt = _entities_prompt(found, clauses)
+        header = "\n\n### 🧾 People, Organizations & Locations\n"
+        parts.append(header)
+        yield header
+        for delta in _stream_complete(prompt, _doc_hash(documents)):
+            parts.append(delta)
+            yield delta
+    _log_result(documents, "entities", "".join(parts).strip(), started, prompt)
+
+
+def stream_answer_query(documents, query, index=None, session_id="default"):
+    started = time.perf_counter()
+    nodes = []
+    if documents:
+        if index is None:
+            index = build_index(documents)
+        with metrics.timed("retrieval"):
+            nodes = _retriever(index, QA_TOP_K).retrieve(query)
+    prompt = _qa_prompt(nodes, query, session_id)
+
+    parts = []
+    for delta in _stream_complete(prompt, _doc_hash(documents)):
+        parts.append(delta)
+        yield delta
+    _record_answer(documents, query, "".join(parts).strip(), session_id,
+                   started, prompt)
+
 
-    index = build_index(doc1 + doc2)
-    prompt = prompts.get("compare", """
-Compare the two legal documents provided. Highlight:
-- Key similarities and differences in clauses
-- Any mismatched obligations or terms
-- Differences in parties, durations, dispute resolution, liabilities, etc.
-Use clear headings and bullet points.
-""")
-    response = index.as_query_engine().query(prompt)
-    save_to_log("uploaded", "comparison", str(response))
-    return str(response)
+STREAM_ANALYSES = {
+    "summary": lambda documents, index=None: stream_summarize_document(documents),
+    "clauses": stream_highlight_clauses,
+    "breakdown": stream_clause_breakdown,
+    "simplify": stream_simplify_legal_jargon,
+    "entities": stream_extract_entities,
+}
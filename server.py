@@ -1,9 +1,23 @@
+from typing import Optional
+
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from legal_backend import load_document, summarize_document, highlight_clauses, answer_query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from legal_backend import (
+    aload_document, aanalyze_document, aanswer_query,
+    stream_answer_query, STREAM_ANALYSES, ANALYSES, log_history, log_stats,
+    metrics_text, incremental_clause_breakdown,
+    add_to_corpus, remove_from_corpus, search_corpus, corpus_documents,
+    extract_entities_structured, abuild_index, clause_map, set_current_user,
+)
+from utils.jobs import JobManager
 
+import asyncio
+import json
 import shutil
 import os
+import uuid
 
 app = FastAPI()
 
@@ -14,41 +28,288 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id"],
 )
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# 🏭 Long-running analyses run as background jobs in their own processes
+jobs = JobManager(workers=int(os.environ.get("LEGAL_JOB_WORKERS", "2")))
 
-@app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
 
+@app.on_event("shutdown")
+def _stop_jobs():
+    jobs.shutdown()
+
+
+def _write_upload(file, file_path):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
 
-    documents = load_document(file_path)
+
+async def _save_upload(file):
+    # Disk writes stay off the event loop as well. Each upload gets its own
+    # directory, so concurrent uploads of the same filename (or a queued
+    # job's input) never overwrite each other and the original name, which
+    # logs and revision families key on, is kept.
+    name = os.path.basename(file.filename or "") or "upload"
+    file_path = os.path.join(UPLOAD_DIR, uuid.uuid4().hex, name)
+    await run_in_threadpool(_write_upload, file, file_path)
+    return file_path
+
+
+def _latest_upload():
+    paths = []
+    for entry in os.scandir(UPLOAD_DIR):
+        if entry.is_dir():
+            paths += [f.path for f in os.scandir(entry.path) if f.is_file()]
+        elif entry.is_file():
+            paths.append(entry.path)  # uploads saved before per-upload directories
+    return max(paths, key=os.path.getmtime, default=None)
+
+
+@app.post("/upload")
+async def upload_file(file: UploadFile = File(...)):
+    file_path = await _save_upload(file)
+
+    documents = await aload_document(file_path)
 
     if not documents:
         return {"error": "❌ No readable text found in document."}
 
-    summary = summarize_document(documents)
-    clauses = highlight_clauses(documents)
+    report = await aanalyze_document(documents, ["summary", "clauses"])
+    results = report["results"]
 
     return {
         "filename": file.filename,
-        "summary": summary,
-        "clauses": clauses,
+        "summary": results.get("summary", report["errors"].get("summary")),
+        "clauses": results.get("clauses", report["errors"].get("clauses")),
+        "timings": report["timings"],
     }
 
 
+@app.post("/analyze")
+async def analyze(file: UploadFile = File(...), analyses: str = Form("")):
+    file_path = await _save_upload(file)
+
+    documents = await aload_document(file_path)
+    selected = [a.strip() for a in analyses.split(",") if a.strip()]
+    try:
+        report = await aanalyze_document(documents, selected or None)
+    except ValueError as e:
+        return {"error": f"❌ {e}"}
+
+    return {"filename": file.filename, **report}
+
+
+@app.post("/breakdown/revision")
+async def breakdown_revision(file: UploadFile = File(...), family: str = Form("")):
+    # Explains only the clauses that changed since the family's last revision
+    file_path = await _save_upload(file)
+
+    documents = await aload_document(file_path)
+    if not documents:
+        return {"error": "❌ No readable text found in document."}
+
+    result = await run_in_threadpool(
+        incremental_clause_breakdown, documents, family.strip() or None)
+    return {"filename": file.filename, **result}
+
+
+@app.post("/entities")
+async def entities(file: UploadFile = File(...), llm_fallback: bool = Form(True)):
+    # Rule-based entities with character offsets; the LLM only adds names/places
+    file_path = await _save_upload(file)
+
+    documents = await aload_document(file_path)
+    if not documents:
+        return {"error": "❌ No readable text found in document."}
+
+    result = await run_in_threadpool(extract_entities_structured, documents, llm_fallback)
+    return {"filename": file.filename, **result}
+
+
+@app.post("/clauses/map")
+async def clauses_map(file: UploadFile = File(...), categories: str = Form("")):
+    # Locally tagged clause map, e.g. categories=Termination,Auto-Renewal
+    file_path = await _save_upload(file)
+
+    documents = await aload_document(file_path)
+    if not documents:
+        return {"error": "❌ No readable text found in document."}
+
+    index = await abuild_index(documents)
+    selected = [c.strip() for c in categories.split(",") if c.strip()]
+    entries = await run_in_threadpool(clause_map, documents, index, selected or None)
+    return {"filename": file.filename, "clauses": entries}
+
+
 @app.post("/ask")
-async def ask(question: str = Form(...)):
-    files = os.listdir(UPLOAD_DIR)
-    if not files:
+async def ask(question: str = Form(...), session_id: Optional[str] = Form(None),
+              user: Optional[str] = Form(None)):
+    # Without a session_id the client starts a new conversation; send the
+    # returned id back to continue it. `user` is who the answer is logged for.
+    session_id = session_id or uuid.uuid4().hex
+    set_current_user(user)
+    last_file = await run_in_threadpool(_latest_upload)
+    if last_file is None:
         return {"error": "❌ No file uploaded yet."}
 
-    last_file = os.path.join(UPLOAD_DIR, sorted(files)[-1])
-    docs = load_document(last_file)
-    answer = answer_query(docs, question)
-    return {"answer": answer}
+    docs = await aload_document(last_file)
+    answer = await aanswer_query(docs, question, session_id=session_id)
+    return {"answer": answer, "session_id": session_id}
+
+
+def _sse(tokens):
+    # Server-sent events: one JSON-encoded delta per event, then a done marker.
+    # Starlette drains this sync generator in its threadpool.
+    try:
+        for token in tokens:
+            yield f"data: {json.dumps(token)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+
+def _stream_response(tokens, headers=None):
+    return StreamingResponse(
+        _sse(tokens), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                 **(headers or {})})
+
+
+@app.post("/stream/analyze")
+async def stream_analyze(file: UploadFile = File(...), analysis: str = Form("summary")):
+    if analysis not in STREAM_ANALYSES:
+        return {"error": f"❌ Unknown analysis: {analysis}"}
+
+    file_path = await _save_upload(file)
+    documents = await aload_document(file_path)
+    return _stream_response(STREAM_ANALYSES[analysis](documents))
+
+
+@app.post("/stream/ask")
+async def stream_ask(question: str = Form(...), session_id: Optional[str] = Form(None),
+                     user: Optional[str] = Form(None)):
+    session_id = session_id or uuid.uuid4().hex
+    set_current_user(user)
+    last_file = await run_in_threadpool(_latest_upload)
+    if last_file is None:
+        return {"error": "❌ No file uploaded yet."}
+
+    docs = await aload_document(last_file)
+    return _stream_response(
+        stream_answer_query(docs, question, session_id=session_id),
+        headers={"X-Session-Id": session_id})
+
+
+@app.post("/jobs")
+async def submit_job(file: UploadFile = File(...), analyses: str = Form("summary,clauses")):
+    selected = [a.strip() for a in analyses.split(",") if a.strip()] or list(ANALYSES)
+    unknown = [a for a in selected if a not in ANALYSES]
+    if unknown:
+        return {"error": f"❌ Unknown analyses: {', '.join(unknown)}"}
+
+    file_path = await _save_upload(file)
+    job_id = await run_in_threadpool(jobs.submit, file_path, selected)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await run_in_threadpool(jobs.get, job_id)
+    if job is None:
+        return {"error": "❌ Unknown job."}
+    return job
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    async def events():
+        last = None
+        while True:
+            job = await run_in_threadpool(jobs.get, job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps('Unknown job.')}\n\n"
+                return
+            snapshot = (job["status"], job["stages"])
+            if snapshot != last:
+                last = snapshot
+                yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] in ("done", "failed"):
+                yield "event: done\ndata: {}\n\n"
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/logs")
+async def logs(doc_hash: Optional[str] = None, user: Optional[str] = None,
+               category: Optional[str] = None, since: Optional[float] = None,
+               until: Optional[float] = None, limit: int = 100, offset: int = 0):
+    rows = await run_in_threadpool(
+        log_history, doc_hash=doc_hash, user=user, category=category,
+        since=since, until=until, limit=min(limit, 1000), offset=offset)
+    return {"rows": rows}
+
+
+@app.get("/logs/stats")
+async def logs_stats(group_by: str = "category", user: Optional[str] = None,
+                     category: Optional[str] = None, since: Optional[float] = None):
+    try:
+        rows = await run_in_threadpool(
+            log_stats, group_by, user=user, category=category, since=since)
+    except ValueError as e:
+        return {"error": f"❌ {e}"}
+    return {"rows": rows}
+
+
+@app.post("/corpus")
+async def corpus_add(file: UploadFile = File(...), user: Optional[str] = Form(None),
+                     doc_type: Optional[str] = Form(None)):
+    file_path = await _save_upload(file)
+
+    documents = await aload_document(file_path)
+    if not documents:
+        return {"error": "❌ No readable text found in document."}
+
+    doc_hash = await run_in_threadpool(add_to_corpus, documents, user, doc_type)
+    return {"filename": file.filename, "doc_hash": doc_hash}
+
+
+@app.delete("/corpus/{doc_hash}")
+async def corpus_remove(doc_hash: str):
+    removed = await run_in_threadpool(remove_from_corpus, doc_hash)
+    return {"doc_hash": doc_hash, "removed": removed}
+
+
+@app.get("/corpus/documents")
+async def corpus_list(user: Optional[str] = None, doc_type: Optional[str] = None,
+                      filename: Optional[str] = None):
+    docs = await run_in_threadpool(
+        corpus_documents, user=user, doc_type=doc_type, filename=filename)
+    return {"documents": docs}
+
+
+@app.get("/corpus/search")
+async def corpus_search(q: str, top_k: int = 10, per_document: bool = False,
+                        min_score: Optional[float] = None, hybrid: bool = True,
+                        filename: Optional[str] = None, user: Optional[str] = None,
+                        doc_type: Optional[str] = None,
+                        clause_category: Optional[str] = None):
+    # e.g. /corpus/search?q=automatic renewal&doc_type=lease&per_document=true
+    hits = await run_in_threadpool(
+        search_corpus, q, top_k=min(top_k, 1000), per_document=per_document,
+        min_score=min_score, hybrid=hybrid, filename=filename, user=user, doc_type=doc_type,
+        clause_category=clause_category)
+    return {"hits": hits}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics_text(),
+                             media_type="text/plain; version=0.0.4")
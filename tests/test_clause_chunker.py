@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from llama_index.core import Document
+from llama_index.core.schema import MetadataMode
+
+from utils.clause_chunker import ClauseNodeParser, split_clauses
+
+
+def test_nodes_embed_the_bare_clause_text():
+    text = "1. Rent. The Tenant shall pay rent monthly.\n2. Term. The term is two years."
+    doc = Document(text=text, metadata={"file_name": "lease.pdf"},
+                   excluded_embed_metadata_keys=["file_name"],
+                   excluded_llm_metadata_keys=["file_name"])
+
+    nodes = ClauseNodeParser().get_nodes_from_documents([doc])
+    # Same text the corpus and document comparison embed for each clause
+    assert [n.get_content(MetadataMode.EMBED) for n in nodes] == \
+        [c["text"] for c in split_clauses(text)]
+    # The LLM still sees where a clause sits, but not bookkeeping
+    llm_text = nodes[1].get_content(MetadataMode.LLM)
+    assert "section: 2" in llm_text
+    assert "clause_kind" not in llm_text and "lease.pdf" not in llm_text
+    assert doc.excluded_embed_metadata_keys == ["file_name"]
@@ -0,0 +1,52 @@
+import random
+import time
+
+import pytest
+
+from utils.clause_store import align_clauses, clause_hash
+
+
+def _clauses(texts, sections=None):
+    sections = sections or [f"{i + 1}." for i in range(len(texts))]
+    return [{"text": text, "section": section, "hash": clause_hash(text)}
+            for text, section in zip(texts, sections)]
+
+
+def test_alignment_statuses():
+    old = _clauses(["The Tenant shall pay rent monthly in advance.",
+                    "This lease may be terminated on sixty days notice.",
+                    "The Landlord shall maintain the roof and structure."])
+    new = _clauses(["The Tenant shall pay rent monthly in advance.",
+                    "This lease may be terminated on ninety days written notice.",
+                    "Pets are not permitted on the premises without consent."])
+    pairs, removed = align_clauses(new, old)
+    assert pairs == [("unchanged", 0), ("modified", 1), ("added", None)]
+    assert removed == [2]
+
+
+def test_renumbered_clause_is_found_outside_its_section():
+    old = _clauses(["Notices must be sent by registered post to the address above.",
+                    "Each party shall keep the terms of this agreement confidential."])
+    new = _clauses(["Each party shall keep the terms of this Agreement strictly confidential.",
+                    "Notices must be sent by registered post or email to the address above."],
+                   sections=["7.", "9."])
+    pairs, removed = align_clauses(new, old)
+    assert pairs == [("modified", 1), ("modified", 0)]
+    assert removed == []
+
+
+@pytest.mark.parametrize("renumbered", [False, True])
+def test_global_redline_stays_fast(renumbered):
+    # Every clause changes ("shall" -> "must"), which used to compare every
+    # new clause with every old one
+    rng = random.Random(0)
+    words = "party agreement notice term payment rent clause law court days written".split()
+    old_texts = [f"Clause {i}: The party shall " +
+                 " ".join(rng.choice(words) for _ in range(60)) for i in range(1000)]
+    new_texts = [text.replace("shall", "must") for text in old_texts]
+    sections = [f"{i + 100}." for i in range(1000)] if renumbered else None
+    started = time.perf_counter()
+    pairs, removed = align_clauses(_clauses(new_texts, sections), _clauses(old_texts))
+    assert time.perf_counter() - started < 10
+    assert pairs == [("modified", i) for i in range(1000)]
+    assert removed == []
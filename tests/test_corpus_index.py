@@ -0,0 +1,69 @@
+import numpy as np
+
+from utils.corpus_index import CorpusIndex
+
+
+def _chunks(*texts):
+    return [{"text": text, "section": f"{i + 1}."} for i, text in enumerate(texts)]
+
+
+def _vectors(n, seed):
+    return np.random.default_rng(seed).normal(size=(n, 8))
+
+
+def test_processes_share_one_manifest(tmp_path):
+    # Two instances on one directory stand in for the server and a batch run
+    server, batch = CorpusIndex(str(tmp_path)), CorpusIndex(str(tmp_path))
+    assert server.add("lease", _chunks("Rent is due monthly."), _vectors(1, 0), doc_type="lease")
+    assert batch.add("nda", _chunks("Confidential information", "Term of two years"),
+                     _vectors(2, 1), doc_type="nda")
+
+    # The server sees the batch's document without a restart...
+    assert "nda" in server
+    assert {d["doc_hash"] for d in server.documents()} == {"lease", "nda"}
+    # ...and removing its own document keeps the batch's entry and files
+    assert server.remove("lease")
+    assert [d["doc_hash"] for d in batch.documents()] == ["nda"]
+    assert [d["doc_hash"] for d in CorpusIndex(str(tmp_path)).documents()] == ["nda"]
+    assert (tmp_path / "docs" / "nda.npy").exists()
+    assert not (tmp_path / "docs" / "lease.npy").exists()
+
+
+def test_search_sees_documents_added_elsewhere(tmp_path):
+    server, batch = CorpusIndex(str(tmp_path)), CorpusIndex(str(tmp_path))
+    vectors = _vectors(2, 2)
+    batch.add("nda", _chunks("Confidential information", "Governing law"), vectors)
+
+    hits = server.search(vectors[1], top_k=1, query_text="governing law")
+    assert [(h["doc_hash"], h["section"]) for h in hits] == [("nda", "2.")]
+    hits = server.search(vectors[0], top_k=5, doc_type="lease")
+    assert hits == []
+
+
+def test_legacy_jsonl_manifest_is_imported(tmp_path):
+    CorpusIndex(str(tmp_path)).add("lease", _chunks("Rent is due."), _vectors(1, 3))
+    (tmp_path / "manifest.sqlite").unlink()
+    (tmp_path / "manifest.jsonl").write_text(
+        '{"doc_hash": "lease", "filename": "a.pdf", "user": null, '
+        '"doc_type": "lease", "chunks": 1, "added": 1.0}\n{"torn', encoding="utf-8")
+
+    corpus = CorpusIndex(str(tmp_path))
+    assert [d["filename"] for d in corpus.documents()] == ["a.pdf"]
+    assert corpus.stats() == {"documents": 1, "chunks": 1}
+
+
+def test_keyword_index_is_loaded_from_its_snapshot(tmp_path, monkeypatch):
+    corpus = CorpusIndex(str(tmp_path))
+    vectors = _vectors(2, 4)
+    corpus.add("nda", _chunks("Confidential information", "Governing law"), vectors)
+    corpus.add("lease", _chunks("Rent is due monthly."), _vectors(1, 5))
+    corpus.save_keywords()
+    CorpusIndex(str(tmp_path)).remove("lease")  # another process, after the save
+
+    tokenised = []
+    monkeypatch.setattr("utils.bm25.BM25Index.add",
+                        lambda self, doc_id, text: tokenised.append(doc_id))
+    reopened = CorpusIndex(str(tmp_path))
+    assert tokenised == []
+    hits = reopened.search(vectors[1], top_k=3, query_text="rent governing law")
+    assert {h["doc_hash"] for h in hits} == {"nda"}
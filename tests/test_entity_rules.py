@@ -0,0 +1,44 @@
+from utils.entity_rules import PATTERNS, extract_rule_entities, unique_values
+
+
+PREAMBLE = (
+    'This Lease Agreement (the "Agreement") is made on January 5, 2024 between '
+    'Acme Holdings Ltd., a Delaware corporation (the "Landlord"), and John Smith, '
+    'residing at 22 Oak Road (hereinafter referred to as the “Tenant”).\n\n'
+)
+
+
+def found(category, text):
+    return [m.group(0) for m in PATTERNS[category].finditer(text)]
+
+
+def test_dates():
+    text = "Signed 1st February 2024, due 03/02/2024, renewed 1.2.2024 and 2024-01-05."
+    assert found("dates", text) == ["1st February 2024", "03/02/2024", "1.2.2024", "2024-01-05"]
+
+
+def test_section_numbers_are_not_dates():
+    assert found("dates", "as set out in 3.2.10 and 12.4.1 above") == []
+
+
+def test_section_refs_any_case():
+    text = "See clause 4, Section 12.3(b), SCHEDULE A and Article IV."
+    assert found("section_refs", text) == ["clause 4", "Section 12.3(b)", "SCHEDULE A", "Article IV"]
+
+
+def test_amounts_percentages_durations():
+    text = "Rent of $1,250.00 rising 3.5% a year, a fee of USD 50, payable within thirty (30) days."
+    assert found("amounts", text) == ["$1,250.00", "USD 50"]
+    assert found("percentages", text) == ["3.5%"]
+    assert found("durations", text) == ["thirty (30) days"]
+
+
+def test_parties_and_defined_terms_with_offsets():
+    result = extract_rule_entities(PREAMBLE + "1.1 Rent is due monthly.", [(0, "Preamble")])
+    parties = [(p["text"], p["role"]) for p in result["parties"]]
+    assert parties == [("Acme Holdings Ltd", "Landlord"), ("John Smith", "Tenant")]
+    for party in result["parties"]:
+        assert PREAMBLE[party["start"]:party["end"]] == party["text"]
+    assert [t for t, _ in unique_values(result["defined_terms"], key="term")] == [
+        "Agreement", "Landlord", "Tenant"]
+    assert result["dates"][0]["section"] == "Preamble"
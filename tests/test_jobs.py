@@ -0,0 +1,87 @@
+import threading
+import time
+
+from utils.jobs import JobStore
+
+
+def _store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def test_only_one_process_claims_a_job(tmp_path):
+    job_id = _store(tmp_path).create("contract.pdf", ["summary"])
+    # Separate connections stand in for separate server/worker processes
+    stores = [_store(tmp_path) for _ in range(8)]
+    wins = []
+    barrier = threading.Barrier(len(stores))
+
+    def race(i, store):
+        barrier.wait()
+        if store.claim(job_id, f"worker-{i}"):
+            wins.append(i)
+
+    threads = [threading.Thread(target=race, args=(i, s)) for i, s in enumerate(stores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(wins) == 1
+    job = stores[0].get(job_id)
+    assert job["status"] == "running"
+    assert job["owner"] == f"worker-{wins[0]}"
+
+
+def test_live_lease_is_not_reclaimed(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.create("contract.pdf", ["summary"])
+    assert store.claim(job_id, "a")
+
+    assert not store.claim(job_id, "b")
+    assert store.claimable() == []
+    assert store.renew(job_id, "a")
+    assert not store.renew(job_id, "b")
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.create("contract.pdf", ["summary"])
+    assert store.claim(job_id, "crashed", lease=0.01)
+    time.sleep(0.05)
+
+    assert store.claimable(include_queued=False) == [job_id]
+    assert store.claim(job_id, "b")
+    assert not store.renew(job_id, "crashed")
+    assert store.get(job_id)["owner"] == "b"
+
+
+def test_finished_jobs_are_never_claimed(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.create("contract.pdf", ["summary"])
+    assert store.claim(job_id, "a")
+    assert store.finish(job_id, "a", "done")
+
+    assert not store.claim(job_id, "b")
+    assert not store.renew(job_id, "a")
+    assert store.claimable() == []
+
+
+def test_writes_from_a_reclaimed_worker_are_dropped(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.create("contract.pdf", ["summary"])
+    assert store.claim(job_id, "stalled", lease=0.01)
+    time.sleep(0.05)
+    assert store.claim(job_id, "b")
+    assert store.stage(job_id, "b", "extract", "running")
+
+    # The stalled worker wakes up and reports on a job it no longer owns
+    assert not store.stage(job_id, "stalled", "extract", "done", 1.0)
+    assert not store.stage(job_id, "stalled", "summary", "done", output="stale")
+    assert not store.finish(job_id, "stalled", "failed", "stale")
+
+    job = store.get(job_id)
+    assert job["status"] == "running" and job["error"] is None
+    assert job["stages"]["extract"] == {"status": "running"}
+    assert job["result"] == {}
+    assert store.finish(job_id, "b", "done")
+    assert store.get(job_id)["status"] == "done"
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("llama_index.llms.ollama")
+
+from utils.fake_ollama import serve
+from utils.llm_pool import OllamaPool
+
+
+@pytest.fixture
+def hosts():
+    servers = []
+
+    def start(latency=0.0):
+        server, url = serve(latency=latency)
+        servers.append(server)
+        return url, _count_requests(server)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _count_requests(server):
+    # Concurrency as seen by the host, not by the pool's own bookkeeping
+    handler = server.RequestHandlerClass
+    seen = {"now": 0, "peak": 0, "total": 0}
+    lock = threading.Lock()
+    do_post = handler.do_POST
+
+    def counted(self):
+        with lock:
+            seen["now"] += 1
+            seen["total"] += 1
+            seen["peak"] = max(seen["peak"], seen["now"])
+        try:
+            do_post(self)
+        finally:
+            with lock:
+                seen["now"] -= 1
+
+    handler.do_POST = counted
+    return seen
+
+
+def _pool(urls, **kwargs):
+    kwargs.setdefault("backoff", 0.01)
+    return OllamaPool(model="llama3", hosts=urls, **kwargs)
+
+
+def _complete_all(pool, n):
+    with ThreadPoolExecutor(n) as executor:
+        return list(executor.map(lambda i: pool.complete(f"clause {i}").text, range(n)))
+
+
+def test_in_flight_is_capped_per_host(hosts):
+    url, seen = hosts(latency=0.2)
+    pool = _pool([url], max_inflight=2)
+
+    replies = _complete_all(pool, 6)
+    assert len(replies) == 6 and all(replies)
+    assert seen["peak"] == 2
+    assert seen["total"] == 6
+
+
+def test_async_callers_share_the_cap_with_threads(hosts):
+    url, seen = hosts(latency=0.1)
+    pool = _pool([url], max_inflight=1)
+
+    async def ask(n):
+        return await asyncio.gather(*(pool.acomplete(f"async {i}") for i in range(n)))
+
+    # Slots freed by a thread must wake coroutines waiting on another loop
+    with ThreadPoolExecutor(3) as executor:
+        threaded = [executor.submit(pool.complete, f"sync {i}") for i in range(3)]
+        replies = asyncio.run(ask(3))
+        assert all(f.result().text for f in threaded)
+    assert all(r.text for r in replies)
+    assert seen["peak"] == 1
+    assert seen["total"] == 6
+
+
+def test_load_is_spread_to_the_least_loaded_host(hosts):
+    (first, seen_first), (second, seen_second) = hosts(latency=0.3), hosts(latency=0.3)
+    pool = _pool([first, second], max_inflight=4)
+
+    _complete_all(pool, 4)
+    assert seen_first["peak"] == seen_second["peak"] == 2
+    assert seen_first["total"] == seen_second["total"] == 2
+
+
+def test_raising_the_limit_wakes_waiters(hosts):
+    url, seen = hosts(latency=0.3)
+    pool = _pool([url], max_inflight=1)
+
+    with ThreadPoolExecutor(3) as executor:
+        futures = [executor.submit(pool.complete, f"clause {i}") for i in range(3)]
+        time.sleep(0.1)
+        pool.set_max_inflight(3)
+        assert all(f.result(timeout=5).text for f in futures)
+    assert seen["peak"] == 3
+
+
+def test_timed_out_host_fails_over(hosts, monkeypatch):
+    (slow, seen_slow), (fast, seen_fast) = hosts(latency=2.0), hosts()
+    pool = _pool([slow, fast], request_timeout=0.2, retries=1, backoff=0.5)
+    monkeypatch.setattr("utils.llm_pool.random.choice", lambda backends: backends[0])
+    monkeypatch.setattr("utils.llm_pool.random.random", lambda: 0.0)
+
+    assert pool.complete("governing law").text
+    assert seen_slow["total"] == 1
+    assert seen_fast["total"] == 1
+    # The slow host is left cooling down, so the next call goes straight elsewhere
+    assert pool._backends[0].cooldown_until > time.time()
+    assert pool.complete("termination").text
+    assert seen_slow["total"] == 1
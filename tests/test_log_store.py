@@ -0,0 +1,35 @@
+import sqlite3
+
+from utils.log_store import LogStore, current_user
+
+
+def test_user_and_session_are_separate_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.log_store.LEGACY_CSV_PATH", str(tmp_path / "none.csv"))
+    store = LogStore(str(tmp_path / "log.sqlite"))
+    token = current_user.set("alice")
+    try:
+        store.log("qa", "Q: rent?\nA: $1,000", session_id="3f2a")
+    finally:
+        current_user.reset(token)
+    store.flush()
+
+    [row] = store.history(user="alice")
+    assert (row["user"], row["session_id"]) == ("alice", "3f2a")
+    assert [r["user"] for r in store.stats("user")] == ["alice"]
+
+
+def test_logs_from_before_session_ids_are_migrated(tmp_path):
+    path = str(tmp_path / "log.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE logs (id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, "
+                 "doc_hash TEXT, user TEXT, filename TEXT, category TEXT NOT NULL, "
+                 "content TEXT, latency_ms REAL, prompt_tokens INTEGER, "
+                 "completion_tokens INTEGER)")
+    conn.execute("INSERT INTO logs (ts, user, category) VALUES (1, 'bob', 'summary')")
+    conn.commit()
+    conn.close()
+
+    store = LogStore(path)
+    store.log("qa", "answer", user="bob", session_id="s1")
+    store.flush()
+    assert [r["session_id"] for r in store.history(user="bob")] == ["s1", None]
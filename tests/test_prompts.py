@@ -0,0 +1,56 @@
+import json
+import os
+import string
+
+import pytest
+
+
+PROMPTS_PATH = os.path.join(os.path.dirname(__file__), "..", "prompts", "prompts.json")
+
+# Placeholders each prompt is formatted with in legal_backend / the summarizer.
+# Prompts sent to a query engine as-is must have none.
+EXPECTED_FIELDS = {
+    "summarize": {"content"},
+    "summarize_section": {"content"},
+    "summarize_reduce": {"content"},
+    "highlight_category": {"category", "clauses"},
+    "breakdown": set(),
+    "breakdown_clause": {"section", "clause"},
+    "breakdown_clause_revised": {"section", "previous", "clause"},
+    "simplify": set(),
+    "entities": {"parties", "content"},
+    "compare_clause": {"section_1", "clause_1", "section_2", "clause_2", "diff"},
+    "compact_history": {"summary", "transcript"},
+}
+
+
+def load():
+    with open(PROMPTS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fields(template):
+    return {name for _, name, _, _ in string.Formatter().parse(template) if name is not None}
+
+
+def test_every_prompt_is_known():
+    assert set(load()) == set(EXPECTED_FIELDS)
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_FIELDS))
+def test_prompt_formats_with_expected_fields(name):
+    template = load()[name]
+    assert fields(template) == EXPECTED_FIELDS[name]
+    # Braces in the values must never be re-interpreted
+    rendered = template.format(**{key: "{x}" for key in EXPECTED_FIELDS[name]})
+    assert "{x}" in rendered or not EXPECTED_FIELDS[name]
+
+
+def test_compare_clause_accepts_a_word_diff():
+    from utils.clause_align import word_diff
+
+    diff = word_diff("Rent is due within 30 days.", "Rent is due within 60 days.")
+    assert diff == "Rent is due within [-30-] [+60+] days."
+    prompt = load()["compare_clause"].format(
+        section_1="4 > 4.1", clause_1="a", section_2="4 > 4.1", clause_2="b", diff=diff)
+    assert diff in prompt
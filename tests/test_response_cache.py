@@ -0,0 +1,37 @@
+from utils.response_cache import ResponseCache
+
+
+def _total(cache):
+    return cache._conn.execute("SELECT total FROM cache_size").fetchone()[0]
+
+
+def test_size_total_follows_puts_replacements_and_clears(tmp_path):
+    cache = ResponseCache(str(tmp_path / "r.sqlite"))
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 20)
+    cache.put("a", "z" * 5)  # replacing a row adjusts, not adds
+    assert _total(cache) == 25
+    assert cache.get("a") == "zzzzz"
+    cache.clear()
+    assert _total(cache) == 0
+
+
+def test_least_recently_used_rows_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "r.sqlite"), max_bytes=25)
+    cache.put("old", "x" * 10)
+    cache.put("mid", "y" * 10)
+    cache._conn.execute("UPDATE responses SET accessed = 0 WHERE key = 'old'")
+    cache.put("new", "z" * 10)
+    assert cache.get("old") is None
+    assert cache.get("mid") and cache.get("new")
+    assert _total(cache) == 20
+
+
+def test_processes_share_the_size_total(tmp_path):
+    path = str(tmp_path / "r.sqlite")
+    first, second = ResponseCache(path), ResponseCache(path)
+    first.put("a", "x" * 10)
+    second.put("b", "y" * 7)
+    assert _total(first) == _total(second) == 17
+    # Reopening an existing database keeps the total it already has
+    assert _total(ResponseCache(path)) == 17
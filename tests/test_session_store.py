@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from utils.session_store import MemorySessionBackend, SessionStore, SQLiteSessionBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionBackend()
+    return SQLiteSessionBackend(str(tmp_path / "sessions.sqlite"))
+
+
+def test_sessions_are_isolated(backend):
+    store = SessionStore(backend)
+    store.append("alice", "What is the rent?", "$1,000")
+    store.append("bob", "Who is the tenant?", "Globex")
+
+    assert store.get("alice") == ("", [("What is the rent?", "$1,000")])
+    assert store.get("bob") == ("", [("Who is the tenant?", "Globex")])
+    store.clear("alice")
+    assert store.get("alice") == ("", [])
+    assert store.get("bob")[1] == [("Who is the tenant?", "Globex")]
+
+
+def test_hard_cap_keeps_newest_turns(backend):
+    store = SessionStore(backend, max_tokens=50)
+    for i in range(10):
+        store.append("s", f"question {i} " + "x" * 40, "answer")
+    turns = store.get("s")[1]
+    assert turns[-1][0].startswith("question 9")
+    assert len(turns) < 10
+
+
+def test_compaction_does_not_block_other_sessions(backend):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_compact(summary, transcript):
+        started.set()
+        release.wait(5)
+        return "summary of earlier turns"
+
+    store = SessionStore(backend, max_tokens=60, compact_fn=slow_compact,
+                         keep_recent_turns=1)
+    store.append("other", "hello", "hi")
+    for i in range(3):
+        store.append("busy", f"question {i} " + "x" * 40, "answer")  # under budget
+    worker = threading.Thread(
+        target=store.append, args=("busy", "last " + "x" * 80, "answer"))
+    worker.start()
+    assert started.wait(5)
+
+    t0 = time.perf_counter()
+    assert store.get("other")[1] == [("hello", "hi")]
+    store.append("other", "again", "ok")
+    assert time.perf_counter() - t0 < 0.5
+    # A turn added to the busy session mid-compaction survives the merge
+    store.append("busy", "meanwhile", "kept")
+
+    release.set()
+    worker.join(5)
+    summary, turns = store.get("busy")
+    assert summary == "summary of earlier turns"
+    assert ("meanwhile", "kept") in turns
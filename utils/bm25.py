@@ -0,0 +1,135 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+
+# Section references stay one token ("12.3(b)") so exact citations match
+TOKEN = re.compile(
+    r"\d+(?:\.\d+)*(?:\([a-z0-9]{1,4}\))+|\d+(?:\.\d+)+|[a-z0-9]+(?:['’\-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with which shall may any all such".split())
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "(" in token:
+            tokens.append(token.split("(", 1)[0])  # "12.3(b)" also matches "12.3"
+    return tokens
+
+
+class BM25Index:
+    """Incremental Okapi BM25 over an inverted index (term -> {doc_id: tf})."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._lengths
+
+    def add(self, doc_id, text):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self._lengths:
+                self._remove(doc_id)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(counts.values())
+            self._lengths[doc_id] = length
+            self._total_length += length
+
+    def _remove(self, doc_id):
+        # Postings are only reachable by term, so walk them; removals are rare
+        for term in [t for t, docs in self._postings.items() if doc_id in docs]:
+            docs = self._postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def remove(self, doc_id):
+        with self._lock:
+            if doc_id in self._lengths:
+                self._remove(doc_id)
+
+    def remove_many(self, doc_ids):
+        doc_ids = set(doc_ids) & set(self._lengths)
+        if not doc_ids:
+            return
+        with self._lock:
+            for term in list(self._postings):
+                docs = self._postings[term]
+                for doc_id in doc_ids & docs.keys():
+                    del docs[doc_id]
+                if not docs:
+                    del self._postings[term]
+            for doc_id in doc_ids:
+                self._total_length -= self._lengths.pop(doc_id)
+
+    def search(self, query, top_k=10, allowed=None):
+        """[(doc_id, score)] best first; ``allowed`` restricts the doc ids."""
+        with self._lock:
+            n = len(self._lengths)
+            if not n:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores = {}
+            for term in set(tokenize(query)):
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+
+    def to_dict(self):
+        with self._lock:
+            return {"k1": self.k1, "b": self.b,
+                    "lengths": self._lengths, "postings": self._postings}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data["k1"], data["b"])
+        index._lengths = dict(data["lengths"])
+        index._postings = {term: dict(docs) for term, docs in data["postings"].items()}
+        index._total_length = sum(index._lengths.values())
+        return index
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def reciprocal_rank_fusion(*rankings, k=60):
+    """Fuse ranked id lists: score(id) = sum(1 / (k + rank))."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
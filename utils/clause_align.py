@@ -0,0 +1,70 @@
+import re
+from difflib import SequenceMatcher
+
+import numpy as np
+
+try:  # optimal assignment when SciPy is around, greedy otherwise
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+
+def similarity_matrix(left, right):
+    """Cosine similarity of every left vector against every right vector."""
+    a = np.array(left, dtype=np.float32)
+    b = np.array(right, dtype=np.float32)
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    a /= np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b /= np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return a @ b.T
+
+
+def _greedy(sim):
+    # Highest-similarity pairs first, each row/column used once
+    rows, cols = np.unravel_index(np.argsort(sim, axis=None)[::-1], sim.shape)
+    used_rows, used_cols, pairs = set(), set(), []
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        if i in used_rows or j in used_cols:
+            continue
+        used_rows.add(i)
+        used_cols.add(j)
+        pairs.append((i, j))
+        if len(pairs) == min(sim.shape):
+            break
+    return pairs
+
+
+def assign(sim, min_similarity=0.75):
+    """One-to-one clause pairs as (left, right, score), in left order."""
+    if not sim.size:
+        return []
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(-sim)
+        pairs = zip(rows.tolist(), cols.tolist())
+    else:
+        pairs = _greedy(sim)
+    return sorted((i, j, float(sim[i, j])) for i, j in pairs
+                  if sim[i, j] >= min_similarity)
+
+
+def word_diff(old, new):
+    """Inline word diff: [-removed-] [+added+]. Empty when only spacing differs."""
+    a, b = re.findall(r"\S+", old), re.findall(r"\S+", new)
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    parts, changed = [], False
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            parts.append(" ".join(a[i1:i2]))
+            continue
+        changed = True
+        if i2 > i1:
+            parts.append("[-" + " ".join(a[i1:i2]) + "-]")
+        if j2 > j1:
+            parts.append("[+" + " ".join(b[j1:j2]) + "+]")
+    return " ".join(parts) if changed else ""
+
+
+def diff_ratio(old, new):
+    return SequenceMatcher(None, re.findall(r"\S+", old), re.findall(r"\S+", new),
+                           autojunk=False).ratio()
@@ -0,0 +1,205 @@
+import re
+
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.node_parser import NodeParser
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+
+from utils.tokens import estimate_tokens, split_by_tokens
+
+
+CHUNKER_VERSION = "clauses-v2"
+CLAUSE_METADATA_KEYS = ("section", "heading", "clause_kind")
+
+NUMBERED = re.compile(
+    r"^\s*(?:(?:section|clause|article)\s+)?"
+    r"(?P<num>\d{1,3}(?:\.\d{1,3})+|\d{1,3}(?=[.)]\s))[.)]?\s+(?P<rest>.*)$",
+    re.IGNORECASE)
+ARTICLE = re.compile(r"^\s*(?:ARTICLE|Article)\s+(?P<num>[IVXLC]+|\d+)\b[.:]?\s*(?P<rest>.*)$")
+LETTERED = re.compile(r"^\s*\((?P<label>[a-z]{1,2}|[ivxlc]{1,6}|\d{1,2})\)\s+(?P<rest>.*)$")
+SCHEDULE = re.compile(
+    r"^\s*(?P<label>(?:SCHEDULE|Schedule|ANNEX|Annex|EXHIBIT|Exhibit|APPENDIX|Appendix)"
+    r"\s+[A-Z0-9]{1,4})\b\s*[.:\-–]?\s*(?P<rest>.*)$")
+RECITAL = re.compile(r"^\s*(?:WHEREAS|Whereas|RECITALS?\b|Recitals?\b)")
+SIGNATURE = re.compile(r"^\s*(?:IN WITNESS WHEREOF|In Witness Whereof|SIGNED|Signed by)\b")
+
+
+def _is_heading(text):
+    text = text.strip()
+    letters = [c for c in text if c.isalpha()]
+    if not (3 <= len(letters) and len(text) <= 80) or text.endswith((",", ";")):
+        return False
+    return sum(c.isupper() for c in letters) / len(letters) >= 0.8
+
+
+def _classify(line):
+    if SIGNATURE.match(line):
+        return "signature", None, line.strip()
+    m = SCHEDULE.match(line)
+    if m and (not m.group("rest") or _is_heading(m.group("rest")) or line.strip() == m.group("label")):
+        return "schedule", m.group("label").strip(), m.group("rest")
+    m = ARTICLE.match(line)
+    if m:
+        return "numbered", m.group("num"), m.group("rest")
+    m = NUMBERED.match(line)
+    if m:
+        return "numbered", m.group("num"), m.group("rest")
+    m = LETTERED.match(line)
+    if m:
+        return "lettered", f"({m.group('label')})", m.group("rest")
+    if RECITAL.match(line):
+        return "recital", None, line.strip()
+    if _is_heading(line):
+        return "heading", None, line.strip()
+    return None, None, None
+
+
+def _blocks(text):
+    """Cut text at structural markers; every block keeps its char offsets."""
+    blocks, offset = [], 0
+    for line in text.splitlines(keepends=True):
+        start, offset = offset, offset + len(line)
+        if not line.strip():
+            if blocks:
+                blocks[-1]["end"] = offset
+            continue
+        kind, label, rest = _classify(line)
+        # Signature blocks swallow everything until a schedule starts
+        signed = blocks and blocks[-1]["kind"] == "signature" and kind != "schedule"
+        if kind is None or signed:
+            if blocks:
+                blocks[-1]["end"] = offset
+                blocks[-1]["lines"] += 1
+            else:
+                blocks.append({"kind": "preamble", "label": None, "rest": "",
+                               "start": start, "end": offset, "lines": 1})
+            continue
+        blocks.append({"kind": kind, "label": label, "rest": (rest or "").strip(),
+                       "start": start, "end": offset, "lines": 1})
+    return blocks
+
+
+def split_clauses(text, max_tokens=512):
+    """Split a contract into clause-aligned pieces.
+
+    Returns dicts with `text`, `start`, `end`, `kind` (preamble, recital,
+    clause, schedule, signature), `section_path` (e.g. ["12", "12.3", "(b)"])
+    and the nearest `heading`.
+    """
+    clauses = []
+    numeric_path, schedule, heading = [], None, None
+    pending_start = None  # a heading line waiting to prefix the next clause
+
+    def path_for(number):
+        parts = number.split(".")
+        path = [".".join(parts[:i + 1]) for i in range(len(parts))]
+        return ([schedule] if schedule else []) + path
+
+    def open_clause(block, kind, path):
+        start = block["start"] if pending_start is None else pending_start
+        clauses.append({"kind": kind, "section_path": path, "heading": heading,
+                        "start": start, "end": block["end"]})
+
+    for block in _blocks(text):
+        kind = block["kind"]
+        heading_only = block["lines"] == 1 and (
+            kind == "heading" or (kind in ("numbered", "schedule")
+                                  and (not block["rest"] or _is_heading(block["rest"]))))
+
+        if kind == "numbered":
+            numeric_path = path_for(block["label"])
+            if block["rest"] and _is_heading(block["rest"]):
+                heading = block["rest"]
+        elif kind == "schedule":
+            schedule, numeric_path = block["label"], []
+            heading = block["rest"] or block["label"]
+        elif kind == "heading":
+            heading = block["rest"]
+
+        if heading_only:
+            if pending_start is None:
+                pending_start = block["start"]
+            continue
+
+        last = clauses[-1] if clauses else None
+        if kind == "lettered" and last and last["kind"] in ("clause", "schedule") and \
+                estimate_tokens(text[last["start"]:block["end"]]) <= max_tokens:
+            last["end"] = block["end"]  # sub-items stay with their parent clause
+        elif kind == "recital" and last and last["kind"] == "recital":
+            last["end"] = block["end"]
+        elif kind == "lettered":
+            open_clause(block, "clause", numeric_path + [block["label"]])
+        elif kind == "heading" and not numeric_path and not schedule and \
+                not any(c["kind"] == "clause" for c in clauses):
+            open_clause(block, "preamble", ["Preamble"])  # title + opening words
+        elif kind in ("numbered", "heading"):
+            open_clause(block, "clause", list(numeric_path))
+        elif kind == "schedule":
+            open_clause(block, "schedule", [schedule])
+        elif kind == "recital":
+            open_clause(block, "recital", ["Recitals"])
+        elif kind == "signature":
+            open_clause(block, "signature", ["Signatures"])
+        else:
+            open_clause(block, "preamble", ["Preamble"])
+        pending_start = None
+
+    if pending_start is not None:
+        clauses.append({"kind": "clause", "section_path": list(numeric_path),
+                        "heading": heading, "start": pending_start, "end": len(text)})
+
+    # Oversized clauses are cut on sentence boundaries, keeping their path
+    pieces = []
+    for clause in clauses:
+        body = text[clause["start"]:clause["end"]].strip()
+        if not body:
+            continue
+        if estimate_tokens(body) <= max_tokens:
+            pieces.append(dict(clause, text=body))
+            continue
+        cursor = clause["start"]
+        parts = split_by_tokens(body, max_tokens)
+        for i, part in enumerate(parts, 1):
+            found = text.find(part[:40], cursor)
+            start = found if found >= 0 else cursor
+            cursor = start + len(part)
+            pieces.append(dict(clause, text=part, start=start,
+                               end=min(cursor, clause["end"]),
+                               part=f"{i}/{len(parts)}"))
+    return pieces
+
+
+def section_label(clause):
+    return " > ".join(clause["section_path"]) or clause["kind"].title()
+
+
+class ClauseNodeParser(NodeParser):
+    """One node per contract clause, with its section path as metadata."""
+
+    max_tokens: int = Field(default=512, description="Token cap per node.")
+
+    @classmethod
+    def class_name(cls):
+        return "ClauseNodeParser"
+
+    def _parse_nodes(self, nodes, show_progress=False, **kwargs):
+        all_nodes = []
+        for doc in nodes:
+            clauses = split_clauses(doc.get_content(), self.max_tokens)
+            built = build_nodes_from_splits(
+                [c["text"] for c in clauses], doc, id_func=self.id_func)
+            for node, clause in zip(built, clauses):
+                node.metadata.update(
+                    section=section_label(clause),
+                    heading=clause["heading"] or "",
+                    clause_kind=clause["kind"],
+                )
+                # Embed the bare clause text, as the corpus and comparisons
+                # do, so one clause has one vector wherever it is embedded
+                node.excluded_embed_metadata_keys = [
+                    *node.excluded_embed_metadata_keys, *CLAUSE_METADATA_KEYS]
+                node.excluded_llm_metadata_keys = [
+                    *node.excluded_llm_metadata_keys, "clause_kind"]
+                node.start_char_idx = clause["start"]
+                node.end_char_idx = clause["end"]
+            all_nodes.extend(built)
+        return all_nodes
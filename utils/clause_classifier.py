@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+
+SEEDS_PATH = os.path.join("prompts", "clause_seeds.json")
+OTHER = "Other"
+
+
+def load_seeds(file_path=SEEDS_PATH):
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Clause seed file not found at {file_path}")
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _normalize(vectors):
+    vectors = np.array(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class ClauseClassifier:
+    """Nearest-centroid clause tagger over sentence embeddings.
+
+    Each category's prototype is the mean of its labelled seed clauses,
+    embedded with the same model as the document chunks. Classifying is one
+    matrix product of the chunk vectors against the prototypes, so chunk
+    embeddings already computed for an index can be tagged without touching
+    the model again. Seeds labelled "Other" (boilerplate) give generic
+    clauses somewhere to land instead of being forced into a real category.
+    """
+
+    def __init__(self, embed_batch_fn, seeds, min_similarity=0.5):
+        self._embed_batch = embed_batch_fn
+        self.seeds = seeds
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._labels = None
+        self._centroids = None
+
+    def _prototypes(self):
+        # Built on first use, so importing the backend does not embed the seeds
+        with self._lock:
+            if self._centroids is None:
+                labels, texts, owners = list(self.seeds), [], []
+                for i, label in enumerate(labels):
+                    texts += self.seeds[label]
+                    owners += [i] * len(self.seeds[label])
+                vectors = _normalize(self._embed_batch(texts))
+                owners = np.asarray(owners)
+                centroids = np.stack([vectors[owners == i].mean(axis=0)
+                                      for i in range(len(labels))])
+                self._labels, self._centroids = labels, _normalize(centroids)
+            return self._labels, self._centroids
+
+    def classify(self, vectors):
+        """[(category, similarity)] for each vector, in input order."""
+        if not len(vectors):
+            return []
+        labels, centroids = self._prototypes()
+        sims = _normalize(vectors) @ centroids.T
+        best = sims.argmax(axis=1)
+        scores = sims[np.arange(len(best)), best]
+        return [(labels[i] if score >= self.min_similarity else OTHER, round(float(score), 4))
+                for i, score in zip(best.tolist(), scores.tolist())]
@@ -0,0 +1,172 @@
+import bisect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from difflib import SequenceMatcher
+
+from utils.disk_cache import content_hash
+
+
+CLAUSE_DB_PATH = os.path.join("cache", "clauses.sqlite")
+
+
+def normalize_clause(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def clause_hash(text):
+    return content_hash(normalize_clause(text))
+
+
+def document_family(file_name):
+    """'Lease_v3.pdf', 'lease-rev2.docx', 'Lease (1).pdf' → 'lease'."""
+    stem = os.path.splitext(os.path.basename(file_name or ""))[0].lower()
+    stem = re.sub(r"\s*\(\d+\)$", "", stem)
+    stem = re.sub(r"[\s_\-.]*(?:v|rev|revision|version|draft)?[\s_\-.]*\d+$", "", stem)
+    return stem.strip(" _-.") or "document"
+
+
+class ClauseStore:
+    """Per-clause explanations keyed by clause content hash, plus the clause
+    list of every analyzed revision so the next one can be aligned to it."""
+
+    def __init__(self, path=CLAUSE_DB_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS explanations (
+                clause_hash TEXT NOT NULL, version TEXT NOT NULL,
+                section TEXT, text TEXT NOT NULL, explanation TEXT NOT NULL,
+                created REAL NOT NULL, PRIMARY KEY (clause_hash, version));
+            CREATE TABLE IF NOT EXISTS revisions (
+                family TEXT NOT NULL, doc_hash TEXT NOT NULL,
+                clause_hashes TEXT NOT NULL, created REAL NOT NULL,
+                PRIMARY KEY (family, doc_hash));
+        """)
+        self._conn.commit()
+
+    def explanations(self, hashes, version):
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT clause_hash, section, text, explanation FROM explanations "
+                    f"WHERE version = ? AND clause_hash IN ({','.join('?' * len(batch))})",
+                    [version, *batch]).fetchall()
+                for h, section, text, explanation in rows:
+                    found[h] = {"section": section, "text": text,
+                                "explanation": explanation}
+        return found
+
+    def save_explanations(self, items, version):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO explanations "
+                "(clause_hash, version, section, text, explanation, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(h, version, section, text, explanation, now)
+                 for h, section, text, explanation in items])
+            self._conn.commit()
+
+    def latest_revision(self, family, exclude_doc=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc_hash, clause_hashes FROM revisions "
+                "WHERE family = ? AND doc_hash != ? ORDER BY created DESC LIMIT 1",
+                (family, exclude_doc or "")).fetchone()
+        return (row[0], json.loads(row[1])) if row else (None, [])
+
+    def save_revision(self, family, doc_hash, hashes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO revisions (family, doc_hash, clause_hashes, created) "
+                "VALUES (?, ?, ?, ?)", (family, doc_hash, json.dumps(hashes), time.time()))
+            self._conn.commit()
+
+
+def _best_match(text, candidates, old_texts, best_score):
+    best = None
+    for j in candidates:
+        matcher = SequenceMatcher(None, old_texts[j], text, autojunk=False)
+        if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+            continue
+        score = matcher.ratio()
+        if score > best_score:
+            best, best_score = j, score
+    return best
+
+
+def align_clauses(new_clauses, old_clauses, min_ratio=0.6, max_candidates=50):
+    """Pair each new clause with an old one: exact hash match, else the old
+    clause with the same section label, else the best fuzzy match among about
+    ``max_candidates`` unused old clauses near the same position or closest
+    in length. Returns (pairs,
+    removed) where pairs[i] is (status, old_index or None) and status is one
+    of 'unchanged', 'modified', 'added'."""
+    old_by_hash = {}
+    for j, clause in enumerate(old_clauses):
+        old_by_hash.setdefault(clause["hash"], []).append(j)
+
+    used, pairs = set(), [None] * len(new_clauses)
+    for i, clause in enumerate(new_clauses):
+        for j in old_by_hash.get(clause["hash"], []):
+            if j not in used:
+                used.add(j)
+                pairs[i] = ("unchanged", j)
+                break
+
+    # Compared word by word: an order of magnitude cheaper than characters
+    old_texts = [normalize_clause(old["text"]).split() for old in old_clauses]
+    new_texts = {i: normalize_clause(clause["text"]).split()
+                 for i, clause in enumerate(new_clauses) if pairs[i] is None}
+
+    # Same numbering is strong evidence of the same clause, and it is one
+    # comparison per clause, so a global redline stays linear
+    old_by_section = {}
+    for j, old in enumerate(old_clauses):
+        if j not in used and old.get("section"):
+            old_by_section.setdefault(old["section"], []).append(j)
+    for i, text in new_texts.items():
+        section = new_clauses[i].get("section")
+        candidates = [j for j in old_by_section.get(section, []) if j not in used]
+        best = _best_match(text, candidates, old_texts, min_ratio)
+        if best is not None:
+            used.add(best)
+            pairs[i] = ("modified", best)
+
+    # Whatever was renumbered or moved: scan only the unused old clauses near
+    # the same position in the document, plus those closest in length
+    by_length = sorted((len(old_texts[j]), j) for j in range(len(old_clauses)) if j not in used)
+    lengths = [length for length, _ in by_length]
+    half = max_candidates // 2
+    scale = len(old_clauses) / max(len(new_clauses), 1)
+    for i, text in new_texts.items():
+        if pairs[i] is not None:
+            continue
+        position = int(i * scale)
+        nearby = [j for j in range(max(0, position - half),
+                                   min(len(old_clauses), position + half + 1))
+                  if j not in used]
+        start = bisect.bisect_left(lengths, len(text))
+        window = sorted(by_length[max(0, start - max_candidates):start + max_candidates],
+                        key=lambda item: abs(item[0] - len(text)))
+        similar = [j for _, j in window if j not in used][:half]
+        candidates = list(dict.fromkeys(nearby + similar))
+        best = _best_match(text, candidates, old_texts, min_ratio)
+        if best is None:
+            pairs[i] = ("added", None)
+        else:
+            used.add(best)
+            pairs[i] = ("modified", best)
+
+    removed = [j for j in range(len(old_clauses)) if j not in used]
+    return pairs, removed
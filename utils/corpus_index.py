@@ -0,0 +1,389 @@
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from utils.bm25 import BM25Index, reciprocal_rank_fusion
+
+
+CORPUS_DIR = "corpus"
+MANIFEST_FILE = "manifest.sqlite"
+LEGACY_MANIFEST_FILE = "manifest.jsonl"
+BM25_FILE = "bm25.json"  # keyword index snapshot, like IndexCache's bm25.json
+MANIFEST_COLUMNS = ("doc_hash", "filename", "user", "doc_type", "chunks", "added")
+FILTER_FIELDS = ("doc_hash", "filename", "user", "doc_type", "clause_category")
+
+DOC_TYPES = {
+    "lease": r"\blease\b|landlord|tenant",
+    "nda": r"non-disclosure|confidentiality agreement|\bnda\b",
+    "employment": r"employment agreement|employer|employee",
+    "services": r"services agreement|statement of work|service provider",
+    "loan": r"loan agreement|borrower|lender",
+    "purchase": r"purchase agreement|sale agreement|buyer|seller",
+    "license": r"licen[cs]e agreement|licensor|licensee",
+}
+_DOC_TYPE_PATTERNS = [(name, re.compile(pattern, re.IGNORECASE))
+                      for name, pattern in DOC_TYPES.items()]
+
+
+def guess_doc_type(text):
+    """Document type from the title/opening, e.g. 'lease' or 'nda'."""
+    head = text[:2000]
+    for name, pattern in _DOC_TYPE_PATTERNS:
+        if pattern.search(head):
+            return name
+    return "other"
+
+
+class CorpusIndex:
+    """Persistent flat vector index over many documents.
+
+    Layout under ``root``::
+
+        manifest.sqlite         one row per document (hash, filename, user, type)
+        bm25.json               keyword index snapshot and the documents it covers
+        docs/<hash>.npy         that document's L2-normalized chunk vectors
+        docs/<hash>.jsonl       one metadata line per chunk, same row order
+
+    Adding or removing a document touches only its own files and its own
+    manifest row, so the server, job workers and batch runs can all write
+    to one corpus; each process picks up the others' changes on its next
+    call. In memory all vectors sit in one float32 matrix, and each filter
+    field is an integer-coded column, so a query is a boolean mask followed
+    by one matrix-vector product over the rows that survive.
+    """
+
+    def __init__(self, root=CORPUS_DIR):
+        self.root = root
+        self._docs_dir = os.path.join(root, "docs")
+        os.makedirs(self._docs_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(root, MANIFEST_FILE),
+                                     check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "doc_hash TEXT PRIMARY KEY, filename TEXT, user TEXT, doc_type TEXT, "
+            "chunks INTEGER NOT NULL, added REAL NOT NULL)")
+        self._conn.commit()
+        self._import_legacy_manifest()
+        self._documents = {}
+        self._chunks = {}
+        self._vectors = {}
+        self._matrix = None  # rebuilt lazily after changes
+        # Keyword index starts from the snapshot; only documents it does not
+        # cover are tokenised, and the snapshot is rewritten when it drifted
+        self._bm25, self._keyword_docs = self._load_keywords()
+        self._keywords_dirty = False
+        self._data_version = None
+        self._refresh()
+        if self._keywords_dirty:
+            self.save_keywords()
+        atexit.register(self.save_keywords)
+
+    # ---- persistence -------------------------------------------------
+    def _import_legacy_manifest(self):
+        path = os.path.join(self.root, LEGACY_MANIFEST_FILE)
+        if not os.path.exists(path):
+            return
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line after a crash
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                [tuple(entry.get(column) for column in MANIFEST_COLUMNS)
+                 for entry in entries])
+            self._conn.commit()
+        os.replace(path, path + ".imported")
+
+    def _load_keywords(self):
+        try:
+            with open(os.path.join(self.root, BM25_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return BM25Index.from_dict(data["bm25"]), dict(data["documents"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError):
+            print("⚠️ Corpus keyword snapshot is unreadable; rebuilding it.")
+        return BM25Index(), {}
+
+    def save_keywords(self):
+        """Persist the keyword index if documents were added or removed since."""
+        with self._lock:
+            if not self._keywords_dirty:
+                return
+            data = {"documents": dict(self._keyword_docs), "bm25": self._bm25.to_dict()}
+            self._keywords_dirty = False
+        path = os.path.join(self.root, BM25_FILE)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print("⚠️ Could not save the corpus keyword index:", e)
+
+    def _refresh(self):
+        # data_version changes whenever another connection (another process)
+        # commits, so an unchanged corpus costs one pragma per call
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return
+            self._data_version = version
+            rows = self._conn.execute(
+                f"SELECT {', '.join(MANIFEST_COLUMNS)} FROM documents "
+                "ORDER BY added").fetchall()
+            entries = {row[0]: dict(zip(MANIFEST_COLUMNS, row)) for row in rows}
+            changed = False
+            for doc_hash in [h for h in self._documents if h not in entries]:
+                self._forget(doc_hash)
+                changed = True
+            for doc_hash in [h for h in self._keyword_docs if h not in entries]:
+                self._forget(doc_hash)  # in the snapshot, removed since
+            for doc_hash, entry in entries.items():
+                if doc_hash in self._documents:
+                    continue
+                try:
+                    self._read_document(doc_hash)
+                except (OSError, ValueError):
+                    print(f"⚠️ Corpus entry {doc_hash} is unreadable; skipping it.")
+                    continue
+                self._documents[doc_hash] = entry
+                changed = True
+            if changed:
+                self._matrix = None
+
+    def _forget(self, doc_hash):
+        self._documents.pop(doc_hash, None)
+        self._vectors.pop(doc_hash, None)
+        self._chunks.pop(doc_hash, None)
+        count = self._keyword_docs.pop(doc_hash, None)
+        if count is not None:
+            self._bm25.remove_many(f"{doc_hash}:{i}" for i in range(count))
+            self._keywords_dirty = True
+
+    def _paths(self, doc_hash):
+        base = os.path.join(self._docs_dir, doc_hash)
+        return base + ".npy", base + ".jsonl"
+
+    def _read_document(self, doc_hash):
+        vectors_path, chunks_path = self._paths(doc_hash)
+        vectors = np.load(vectors_path)
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            chunks = [json.loads(line) for line in f]
+        if len(chunks) != len(vectors):
+            raise ValueError("vector/metadata row mismatch")
+        self._vectors[doc_hash] = vectors
+        self._chunks[doc_hash] = chunks
+        if self._keyword_docs.get(doc_hash) != len(chunks):
+            self._index_keywords(doc_hash, chunks)
+
+    def _index_keywords(self, doc_hash, chunks):
+        for i, chunk in enumerate(chunks):
+            self._bm25.add(f"{doc_hash}:{i}",
+                           "\n".join([chunk.get("section") or "", chunk["text"]]))
+        self._keyword_docs[doc_hash] = len(chunks)
+        self._keywords_dirty = True
+
+    # ---- mutation ----------------------------------------------------
+    def __contains__(self, doc_hash):
+        self._refresh()
+        return doc_hash in self._documents
+
+    def add(self, doc_hash, chunks, vectors, filename=None, user=None, doc_type=None):
+        """Add one document. ``chunks`` are dicts with at least ``text`` and
+        optionally ``clause_category``/``section``; ``vectors`` line up with them."""
+        with self._lock:
+            self._refresh()
+            if doc_hash in self._documents or not chunks:
+                return False
+            vectors = np.array(vectors, dtype=np.float32).reshape(len(chunks), -1)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            if self._vectors:
+                dim = next(iter(self._vectors.values())).shape[1]
+                if vectors.shape[1] != dim:
+                    raise ValueError(f"Embedding size {vectors.shape[1]} != corpus size {dim}")
+
+            vectors_path, chunks_path = self._paths(doc_hash)
+            # Data files first, manifest row last: a crash never leaves a
+            # row pointing at missing files
+            # (temp names are unique: another process may add the same document)
+            tmp = f".{uuid.uuid4().hex}.tmp"
+            np.save(vectors_path + tmp + ".npy", vectors)
+            os.replace(vectors_path + tmp + ".npy", vectors_path)
+            with open(chunks_path + tmp, "w", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(json.dumps(chunk) + "\n")
+            os.replace(chunks_path + tmp, chunks_path)
+
+            entry = {"doc_hash": doc_hash, "filename": filename, "user": user,
+                     "doc_type": doc_type, "chunks": len(chunks), "added": time.time()}
+            self._conn.execute(
+                "INSERT OR IGNORE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                tuple(entry[column] for column in MANIFEST_COLUMNS))
+            self._conn.commit()
+            self._documents[doc_hash] = entry
+            self._vectors[doc_hash] = vectors
+            self._chunks[doc_hash] = list(chunks)
+            self._index_keywords(doc_hash, chunks)
+            self._matrix = None
+            return True
+
+    def remove(self, doc_hash):
+        with self._lock:
+            self._refresh()
+            removed = self._conn.execute(
+                "DELETE FROM documents WHERE doc_hash = ?", (doc_hash,)).rowcount
+            self._conn.commit()
+            if not removed and doc_hash not in self._documents:
+                return False
+            self._forget(doc_hash)
+            for path in self._paths(doc_hash):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._matrix = None
+            return True
+
+    # ---- query -------------------------------------------------------
+    def _build(self):
+        order = list(self._documents)
+        vectors = [self._vectors[h] for h in order if len(self._vectors[h])]
+        matrix = np.concatenate(vectors) if vectors else np.zeros((0, 0), np.float32)
+        rows = []
+        for doc_hash in order:
+            doc = self._documents[doc_hash]
+            for i, chunk in enumerate(self._chunks[doc_hash]):
+                rows.append({"key": f"{doc_hash}:{i}", "doc_hash": doc_hash, "filename": doc.get("filename"),
+                             "user": doc.get("user"), "doc_type": doc.get("doc_type"),
+                             "clause_category": chunk.get("clause_category"), "chunk": chunk})
+        columns = {}
+        for field in FILTER_FIELDS:
+            vocab = {}
+            codes = np.fromiter((vocab.setdefault(row[field], len(vocab)) for row in rows),
+                                dtype=np.int32, count=len(rows))
+            columns[field] = (vocab, codes)
+        row_of = {row["key"]: i for i, row in enumerate(rows)}
+        self._matrix = (matrix, rows, columns, row_of)
+        return self._matrix
+
+    def _snapshot(self):
+        with self._lock:
+            self._refresh()
+            return self._matrix or self._build()
+
+    @staticmethod
+    def _mask(columns, size, filters):
+        mask = np.ones(size, dtype=bool)
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            if field not in columns:
+                raise ValueError(f"Unknown filter: {field}")
+            if isinstance(wanted, str):
+                wanted = [wanted]
+            vocab, codes = columns[field]
+            wanted_codes = [vocab[value] for value in wanted if value in vocab]
+            mask &= np.isin(codes, wanted_codes)
+        return mask
+
+    def _hybrid(self, rows, row_of, candidates, scores, query_text, pool):
+        # Dense and BM25 shortlists over the same filtered rows, fused by RRF
+        k = min(pool, len(scores))
+        dense = np.argpartition(-scores, k - 1)[:k]
+        dense = sorted(dense.tolist(), key=lambda i: -scores[i])
+        position = {int(row): i for i, row in enumerate(candidates)}
+        allowed = None if len(candidates) == len(rows) else {
+            rows[row]["key"] for row in candidates.tolist()}
+        sparse = []
+        for key, _ in self._bm25.search(query_text, pool, allowed=allowed):
+            i = position.get(row_of.get(key))
+            if i is not None:
+                sparse.append(i)
+        return reciprocal_rank_fusion(dense, sparse)
+
+    def search(self, query_vector, top_k=10, per_document=False, min_score=None,
+               query_text=None, **filters):
+        """Top-k chunks for ``query_vector`` among rows matching every filter.
+
+        Filters take a value or a list of values per field (filename, user,
+        doc_type, clause_category, doc_hash). With ``per_document`` only the
+        best chunk of each document is returned, so top_k counts documents.
+        Passing ``query_text`` fuses the vector ranking with BM25 (scores are
+        then reciprocal-rank-fusion scores, and ``min_score`` still applies
+        to the cosine similarity).
+        """
+        matrix, rows, columns, row_of = self._snapshot()
+        if not rows:
+            return []
+        candidates = np.flatnonzero(self._mask(columns, len(rows), filters))
+        if not len(candidates):
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = matrix[candidates] @ query
+        if min_score is not None:
+            keep = scores >= min_score
+            candidates, scores = candidates[keep], scores[keep]
+            if not len(candidates):
+                return []
+
+        if query_text:
+            ranked = self._hybrid(rows, row_of, candidates, scores, query_text,
+                                  pool=max(top_k * 10, 100))
+        elif per_document:
+            ranked = [(i, scores[i]) for i in np.argsort(-scores).tolist()]
+        else:
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            ranked = [(i, scores[i]) for i in sorted(top.tolist(), key=lambda i: -scores[i])]
+
+        picked, seen = [], set()
+        for i, score in ranked:
+            doc_hash = rows[candidates[i]]["doc_hash"]
+            if per_document:
+                if doc_hash in seen:
+                    continue
+                seen.add(doc_hash)
+            picked.append((i, score))
+            if len(picked) == top_k:
+                break
+
+        hits = []
+        for i, score in picked:
+            row = rows[candidates[i]]
+            hits.append({"score": round(float(score), 4),
+                         **{field: row[field] for field in FILTER_FIELDS},
+                         **{k: v for k, v in row["chunk"].items() if k != "clause_category"}})
+        return hits
+
+    def documents(self, **filters):
+        with self._lock:
+            self._refresh()
+            docs = list(self._documents.values())
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+            docs = [d for d in docs if d.get(field) in wanted]
+        return docs
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            return {"documents": len(self._documents),
+                    "chunks": sum(len(c) for c in self._chunks.values())}
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+import time
+
+
+def content_hash(*parts):
+    # 🔑 Stable sha256 over any mix of str / bytes parts
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(part)
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def file_hash(path, block_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def touch(path):
+    # Access time is tracked through mtime so LRU order survives restarts
+    now = time.time()
+    try:
+        os.utime(path, (now, now))
+    except FileNotFoundError:
+        pass
+
+
+def entry_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def remove_entry(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def enforce_limits(root, max_entries=None, max_bytes=None, keep=()):
+    """Evict least-recently-used entries of `root` until both limits hold."""
+    if not os.path.isdir(root):
+        return []
+
+    entries = []
+    for name in os.listdir(root):
+        if name.startswith("."):
+            continue  # in-progress temp entries
+        path = os.path.join(root, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        entries.append((mtime, name, path, entry_size(path)))
+
+    entries.sort()  # oldest first
+    total = sum(e[3] for e in entries)
+    count = len(entries)
+    evicted = []
+
+    for mtime, name, path, size in entries:
+        over_count = max_entries is not None and count > max_entries
+        over_bytes = max_bytes is not None and total > max_bytes
+        if not (over_count or over_bytes):
+            break
+        if name in keep:
+            continue
+        remove_entry(path)
+        evicted.append(name)
+        count -= 1
+        total -= size
+
+    return evicted
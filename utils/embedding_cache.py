@@ -0,0 +1,142 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from utils.disk_cache import content_hash
+
+
+EMBEDDING_CACHE_PATH = os.path.join("cache", "embeddings.sqlite")
+
+
+def normalize_chunk(text):
+    # Whitespace-only differences (re-flowed PDFs, templates) share one vector
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingStore:
+    """SQLite-backed map of chunk hash -> float32 vector."""
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})",
+                    batch).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def put_many(self, items):
+        rows = [(key, array("f", vector).tobytes()) for key, vector in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                rows)
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Wraps an embedding model so only unseen chunks are embedded."""
+
+    _inner = PrivateAttr()
+    _store = PrivateAttr()
+    _stats_lock = PrivateAttr()
+    _hits = PrivateAttr(default=0)
+    _misses = PrivateAttr(default=0)
+    _embed_seconds = PrivateAttr(default=0.0)
+
+    def __init__(self, inner, store=None, embed_batch_size=512, **kwargs):
+        super().__init__(model_name=inner.model_name,
+                         embed_batch_size=embed_batch_size, **kwargs)
+        self._inner = inner
+        self._store = store or EmbeddingStore()
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls):
+        return "CachedEmbedding"
+
+    def _key(self, text):
+        return content_hash(self.model_name, normalize_chunk(text))
+
+    def _get_query_embedding(self, query):
+        return self._inner.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query):
+        return await self._inner.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text):
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts):
+        keys = [self._key(text) for text in texts]
+        cached = self._store.get_many(list(set(keys)))
+
+        # Unseen chunks (deduplicated) go to the model in one batched call
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            start = time.perf_counter()
+            vectors = self._inner.get_text_embedding_batch(list(missing.values()))
+            elapsed = time.perf_counter() - start
+            fresh = list(zip(missing.keys(), vectors))
+            self._store.put_many(fresh)
+            cached.update(fresh)
+            with self._stats_lock:
+                self._embed_seconds += elapsed
+
+        with self._stats_lock:
+            self._misses += len(missing)
+            self._hits += len(texts) - len(missing)
+
+        return [cached[key] for key in keys]
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses, seconds = self._hits, self._misses, self._embed_seconds
+        per_chunk = seconds / misses if misses else 0.0
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "embed_seconds": round(seconds, 3),
+            "estimated_seconds_saved": round(hits * per_chunk, 3),
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._hits = self._misses = 0
+            self._embed_seconds = 0.0
@@ -0,0 +1,119 @@
+import bisect
+import re
+
+
+MONTHS = (r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|"
+          r"Aug(?:ust)?|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)")
+NUMBER_WORDS = (r"(?:one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|"
+                r"fifteen|twenty|thirty|forty|forty-five|fifty|sixty|ninety|hundred|"
+                r"one hundred(?: and)? (?:twenty|eighty)|three hundred(?: and)? sixty-five)")
+QUOTE_OPEN = "\"“”'‘"
+QUOTE_CLOSE = "\"”“'’"
+
+PATTERNS = {
+    "dates": re.compile(
+        rf"\b(?:{MONTHS}\.?\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}"
+        rf"|\d{{1,2}}(?:st|nd|rd|th)?\s+(?:day\s+of\s+)?{MONTHS},?\s+\d{{4}}"
+        r"|\d{4}-\d{2}-\d{2}"
+        # Dotted dates need a 4-digit year, or section numbers like 3.2.10 match
+        r"|\d{1,2}/\d{1,2}/\d{2,4}|\d{1,2}\.\d{1,2}\.\d{4})\b"),
+    "amounts": re.compile(
+        r"(?:[$€£₹]\s?|\b(?:USD|EUR|GBP|INR|CAD|AUD|Rs\.?)\s?)\d{1,3}(?:,\d{3})*(?:\.\d+)?"
+        r"(?:\s?(?:[mM]illion|[bB]illion|[tT]housand)\b|[mkMK]\b)?"
+        r"|\b\d{1,3}(?:,\d{3})*(?:\.\d+)?\s?(?:[dD]ollars|[eE]uros|[pP]ounds|[rR]upees)\b"),
+    "percentages": re.compile(
+        r"\b\d+(?:\.\d+)?\s?(?:%|per\s?cent\b|percent\b)", re.IGNORECASE),
+    "durations": re.compile(
+        rf"\b(?:{NUMBER_WORDS}\s+\(\d+\)|\d+|{NUMBER_WORDS})\s+"
+        r"(?:business\s+|calendar\s+|working\s+)?(?:days?|weeks?|months?|years?)\b",
+        re.IGNORECASE),
+    "section_refs": re.compile(
+        r"\b(?i:sections?|clauses?|articles?|paragraphs?|schedules?|exhibits?|annex(?:es)?|appendix)"
+        r"\s+(?:\d+(?:\.\d+)*(?:\([a-z0-9]{1,4}\))*|[IVXLC]+\b|[A-Z]\b)"),
+    "defined_terms": re.compile(
+        rf"\((?:(?:hereinafter|herein)\s+(?:referred\s+to\s+as\s+|called\s+)?)?(?:the\s+)?"
+        rf"[{QUOTE_OPEN}](?P<term>[A-Z][\w\s&\-]{{0,40}}?)[{QUOTE_CLOSE}]\)"
+        rf"|[{QUOTE_OPEN}](?P<term2>[A-Z][\w\s&\-]{{0,40}}?)[{QUOTE_CLOSE}]\s+(?:means|shall\s+mean|refers\s+to)\b",
+        re.IGNORECASE),
+}
+PREAMBLE_CHARS = 3000
+BETWEEN = re.compile(r"\bbetween\b(?P<body>.+?)(?:\n\s*\n|WHEREAS|RECITALS|NOW,? THEREFORE|$)",
+                     re.IGNORECASE | re.DOTALL)
+ROLE = re.compile(rf"\((?:[^()]*?)[{QUOTE_OPEN}](?P<role>[A-Z][\w\s&\-]{{0,40}}?)[{QUOTE_CLOSE}]\)")
+
+
+def _parties(text):
+    match = BETWEEN.search(text[:PREAMBLE_CHARS])
+    if not match:
+        return []
+    parties = []
+    body_start = match.start("body")
+    body = match.group("body")
+    # Split on "and" only outside parentheses so role descriptions stay intact
+    depth, cuts, last = 0, [], 0
+    for m in re.finditer(r"[()]|\band\b", body, re.IGNORECASE):
+        token = m.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            cuts.append((last, m.start()))
+            last = m.end()
+    cuts.append((last, len(body)))
+    for start, end in cuts:
+        chunk = body[start:end]
+        stripped = chunk.strip(" ,;:\n")
+        if not stripped:
+            continue
+        name = re.split(r",|\(|\bhaving\b|\bwhose\b|\bresiding\b", stripped, maxsplit=1)[0].strip()
+        name = re.sub(r"^(?:the\s+)?(?:said\s+)?", "", name, flags=re.IGNORECASE).strip(" .")
+        if not name or not any(c.isupper() for c in name[:2]) or len(name) > 120:
+            continue
+        role = ROLE.search(chunk)
+        offset = body_start + start + chunk.find(name)
+        parties.append({"text": name, "role": role.group("role").strip() if role else None,
+                        "start": offset, "end": offset + len(name)})
+    return parties
+
+
+def extract_rule_entities(text, spans=None):
+    """All rule-based entities in ``text`` with character offsets.
+
+    ``spans`` is an optional sorted list of (start, section label) pairs, for
+    example the clause starts from the chunker, used to tag each match with
+    the section it sits in. Every pattern runs once over the whole text
+    rather than per chunk, which is where the speed comes from.
+    """
+    starts = [start for start, _ in spans or []]
+
+    def section_at(offset):
+        i = bisect.bisect_right(starts, offset) - 1
+        return spans[i][1] if i >= 0 else None
+
+    found = {}
+    for category, pattern in PATTERNS.items():
+        items = []
+        for match in pattern.finditer(text):
+            item = {"text": " ".join(match.group(0).split()),
+                    "start": match.start(), "end": match.end()}
+            if category == "defined_terms":
+                item["term"] = " ".join((match.group("term") or match.group("term2")).split())
+            if spans:
+                item["section"] = section_at(match.start())
+            items.append(item)
+        found[category] = items
+    found["parties"] = _parties(text)
+    if spans:
+        for item in found["parties"]:
+            item["section"] = section_at(item["start"])
+    return found
+
+
+def unique_values(items, key="text"):
+    """Distinct values in first-seen order with how often each occurs."""
+    counts = {}
+    for item in items:
+        value = item.get(key) or item["text"]
+        counts[value] = counts.get(value, 0) + 1
+    return list(counts.items())
@@ -0,0 +1,71 @@
+import os
+
+from docx import Document as DocxDocument
+
+from utils.disk_cache import content_hash, file_hash
+from utils.metrics import metrics
+from utils.pdf_extract import extract_pdf
+from utils.text_cache import TextCache
+
+
+# 📄 Extracted text per file content; bump the version when extraction changes.
+# Kept free of models and indexes so extraction worker processes start light.
+EXTRACTION_VERSION = "2"
+text_cache = TextCache()
+
+
+def extract_text(file_path):
+    text = ""
+    metadata = {}
+    # Same rule as batch discovery: "Lease.PDF" is a PDF
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".txt":
+        with open(file_path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+    elif extension == ".docx":
+        doc = DocxDocument(file_path)
+        text = "\n".join([p.text for p in doc.paragraphs])
+
+    elif extension == ".pdf":
+        # 📑 Text layer per page; only image-only pages pay for OCR
+        report = extract_pdf(file_path)
+        text = report["text"]
+        metadata.update(page_count=report["page_count"],
+                        ocr_pages=report["ocr_pages"],
+                        ocr_page_timings=report["ocr_page_timings"])
+
+    return text, metadata
+
+
+def record_extraction(file_path, extension, metadata):
+    metrics.inc("legal_bytes_processed_total", os.path.getsize(file_path),
+                ext=extension)
+    if "page_count" in metadata:
+        ocr_pages = len(metadata["ocr_pages"])
+        metrics.inc("legal_pages_processed_total",
+                    metadata["page_count"] - ocr_pages, method="text_layer")
+        metrics.inc("legal_pages_processed_total", ocr_pages, method="ocr")
+        for page in metadata["ocr_page_timings"]:
+            metrics.observe("legal_stage_seconds", page["ocr_seconds"],
+                            stage="ocr_page")
+
+
+def load_text(file_path):
+    """(cache key, {"text", "metadata"}) for a file, extracting only on a miss."""
+    extension = os.path.splitext(file_path)[1].lower()
+    with metrics.timed("load_document", ext=extension):
+        key = content_hash(EXTRACTION_VERSION, extension, file_hash(file_path))
+
+        entry = text_cache.get(key)
+        metrics.inc("legal_cache_requests_total", cache="text",
+                    result="miss" if entry is None else "hit")
+        if entry is None:
+            with metrics.timed("extract", ext=extension):
+                text, metadata = extract_text(file_path)
+            if not text.strip():
+                raise ValueError(
+                    "❌ No extractable text found in the uploaded document.")
+            record_extraction(file_path, extension, metadata)
+            entry = text_cache.put(key, text, metadata)
+    return key, entry
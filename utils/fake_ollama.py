@@ -0,0 +1,128 @@
+"""Deterministic stand-in for the Ollama HTTP API, for tests and benchmarks.
+
+    python -m utils.fake_ollama --port 11500 --latency 0.5 --token-delay 0.01
+
+Answers /api/generate and /api/chat (streaming or not) with text derived
+from a hash of the prompt, so identical prompts always get identical replies.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+WORDS = ("the tenant shall pay rent monthly and the landlord shall maintain "
+         "the premises subject to termination on thirty days written notice").split()
+
+
+def fake_reply(prompt, tokens=48):
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    return "- " + " ".join(rng.choice(WORDS) for _ in range(tokens)).capitalize() + "."
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    token_delay = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "llama3:latest", "model": "llama3:latest"}]})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path == "/api/generate":
+            prompt = request.get("prompt", "")
+            chat = False
+        elif self.path == "/api/chat":
+            prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+            chat = True
+        else:
+            self._send_json({"error": "not found"}, 404)
+            return
+
+        time.sleep(self.latency)
+        reply = fake_reply(prompt)
+        base = {
+            "model": request.get("model", "llama3"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        stats = {"done_reason": "stop", "prompt_eval_count": len(prompt) // 4,
+                 "eval_count": len(reply.split()), "total_duration": 0}
+
+        def message(text):
+            if chat:
+                return {"message": {"role": "assistant", "content": text}}
+            return {"response": text}
+
+        if not request.get("stream", True):
+            self._send_json({**base, **message(reply), "done": True, **stats})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_line(payload):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        for i, word in enumerate(reply.split(" ")):
+            time.sleep(self.token_delay)
+            write_line({**base, **message(word if i == 0 else " " + word), "done": False})
+        write_line({**base, **message(""), "done": True, **stats})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def serve(host="127.0.0.1", port=0, latency=0.0, token_delay=0.0):
+    """Start a fake server on a background thread; returns (server, base_url)."""
+    handler = type("Handler", (FakeOllamaHandler,),
+                   {"latency": latency, "token_delay": token_delay})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = serve(args.host, args.port, args.latency, args.token_delay)
+    print(f"🤖 Fake Ollama listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore
+
+from utils.bm25 import BM25Index, reciprocal_rank_fusion
+
+
+def node_search_text(node):
+    # Section labels and headings carry the clause numbers people search for
+    meta = node.metadata
+    return "\n".join([meta.get("section") or "", meta.get("heading") or "",
+                      node.get_content()])
+
+
+def bm25_for_index(index):
+    """BM25 over every node in a vector index's docstore."""
+    bm25 = BM25Index()
+    for node_id, node in index.docstore.docs.items():
+        bm25.add(node_id, node_search_text(node))
+    return bm25
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense top-k and BM25 top-k over the same nodes, fused with RRF."""
+
+    def __init__(self, index, bm25, similarity_top_k=2, candidate_k=10, rrf_k=60, **kwargs):
+        self._vector = index.as_retriever(similarity_top_k=max(candidate_k, similarity_top_k))
+        self._docstore = index.docstore
+        self._bm25 = bm25
+        self._top_k = similarity_top_k
+        self._candidate_k = max(candidate_k, similarity_top_k)
+        self._rrf_k = rrf_k
+        super().__init__(**kwargs)
+
+    def _fuse(self, dense, query):
+        by_id = {hit.node.node_id: hit for hit in dense}
+        sparse = [node_id for node_id, _ in self._bm25.search(query, self._candidate_k)]
+        fused = reciprocal_rank_fusion(
+            [hit.node.node_id for hit in dense], sparse, k=self._rrf_k)
+        results = []
+        for node_id, score in fused[:self._top_k]:
+            node = by_id[node_id].node if node_id in by_id else self._docstore.get_node(node_id)
+            results.append(NodeWithScore(node=node, score=score))
+        return results
+
+    def _retrieve(self, query_bundle):
+        return self._fuse(self._vector.retrieve(query_bundle), query_bundle.query_str)
+
+    async def _aretrieve(self, query_bundle):
+        dense = await self._vector.aretrieve(query_bundle)
+        return self._fuse(dense, query_bundle.query_str)
@@ -0,0 +1,119 @@
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+from llama_index.core import StorageContext, load_index_from_storage
+
+from utils.bm25 import BM25Index
+from utils.disk_cache import content_hash, enforce_limits, touch
+
+
+INDEX_CACHE_DIR = os.path.join("cache", "indexes")
+BM25_FILE = "bm25.json"  # keyword index persisted next to the vector index
+
+
+class IndexCache:
+    """Content-addressed vector index cache: memory LRU in front of a disk LRU."""
+
+    def __init__(self, root=INDEX_CACHE_DIR, max_entries=64,
+                 max_bytes=1024 * 1024 * 1024, memory_entries=8):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, documents, model_name):
+        return content_hash(model_name, *[doc.text for doc in documents])
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _remember(self, key, index):
+        with self._lock:
+            self._memory[key] = index
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, key):
+        with self._lock:
+            index = self._memory.get(key)
+            if index is not None:
+                self._memory.move_to_end(key)
+            return index
+
+    def get(self, key):
+        index = self._from_memory(key)
+        if index is not None:
+            touch(os.path.join(self.root, key))
+            return index
+
+        path = os.path.join(self.root, key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            storage = StorageContext.from_defaults(persist_dir=path)
+            index = load_index_from_storage(storage)
+            if os.path.exists(os.path.join(path, BM25_FILE)):
+                index.bm25 = BM25Index.load(os.path.join(path, BM25_FILE))
+        except Exception as e:
+            print("⚠️ Dropping unreadable cached index:", e)
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        touch(path)
+        self._remember(key, index)
+        return index
+
+    def put(self, key, index):
+        os.makedirs(self.root, exist_ok=True)
+        # Persist into a hidden temp dir first so readers never see half an index
+        tmp_path = os.path.join(self.root, f".tmp-{key}-{uuid.uuid4().hex}")
+        path = os.path.join(self.root, key)
+        index.storage_context.persist(persist_dir=tmp_path)
+        if getattr(index, "bm25", None) is not None:
+            index.bm25.save(os.path.join(tmp_path, BM25_FILE))
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another worker persisted the same content first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        touch(path)
+        self._remember(key, index)
+        enforce_limits(self.root, self.max_entries, self.max_bytes, keep=(key,))
+
+    def get_or_build(self, documents, model_name, build_fn):
+        key = self.key_for(documents, model_name)
+        index = self.get(key)
+        if index is not None:
+            self.hits += 1
+            return index
+
+        # One build per document even when several analyses ask at once
+        with self._key_lock(key):
+            index = self.get(key)
+            if index is None:
+                self.misses += 1
+                index = build_fn(documents)
+                self.put(key, index)
+            else:
+                self.hits += 1
+        return index
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        shutil.rmtree(self.root, ignore_errors=True)
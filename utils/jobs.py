@@ -0,0 +1,261 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+JOBS_DB_PATH = os.path.join("jobs", "jobs.sqlite")
+
+FINISHED = ("done", "failed")
+# A running job's owner renews its lease well before it lapses; a lease that
+# does lapse means the worker died and the job may be claimed again
+LEASE_SECONDS = 60
+COLUMNS = ["id", "status", "file_path", "analyses", "stages", "result",
+           "error", "created", "updated", "owner", "lease_until"]
+
+
+class JobStore:
+    """Durable job records; every worker process opens its own connection."""
+
+    def __init__(self, path=JOBS_DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, file_path TEXT NOT NULL, "
+            "analyses TEXT NOT NULL, stages TEXT NOT NULL, result TEXT, "
+            "error TEXT, created REAL NOT NULL, updated REAL NOT NULL, "
+            "owner TEXT, lease_until REAL)")
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("owner TEXT", "lease_until REAL"):
+            if column.split()[0] not in existing:  # databases from before leases
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    @staticmethod
+    def _row_to_job(row):
+        job = dict(zip(COLUMNS, row))
+        for key in ("analyses", "stages", "result"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+    def create(self, file_path, analyses):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        stages = {name: {"status": "pending"}
+                  for name in ["extract", "index", *analyses]}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, file_path, analyses, stages, "
+                "created, updated) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, file_path, json.dumps(analyses), json.dumps(stages),
+                 now, now))
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?",
+                (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def _update(self, job_id, owner, mutate):
+        # Read-modify-write under an immediate transaction: stages of one job
+        # are updated from several threads at once. Only the lease holder
+        # writes; a worker whose lease lapsed and was reclaimed is ignored.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT status, stages, result, error FROM jobs "
+                    "WHERE id = ? AND owner = ?", (job_id, owner)).fetchone()
+                if row is None:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                status, stages, result, error = row
+                stages = json.loads(stages)
+                result = json.loads(result) if result else {}
+                status, error = mutate(stages, result, status, error)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, stages = ?, result = ?, "
+                    "error = ?, updated = ? WHERE id = ? AND owner = ?",
+                    (status, json.dumps(stages), json.dumps(result), error,
+                     time.time(), job_id, owner))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def stage(self, job_id, owner, name, status, seconds=None, error=None,
+              output=None):
+        """Record a stage's progress; False (and nothing written) unless
+        `owner` still holds the job."""
+        def mutate(stages, result, job_status, job_error):
+            stages[name] = {"status": status}
+            if seconds is not None:
+                stages[name]["seconds"] = round(seconds, 3)
+            if error:
+                stages[name]["error"] = error
+            if output is not None:
+                result[name] = output
+            return ("running" if job_status == "queued" else job_status), job_error
+        return self._update(job_id, owner, mutate)
+
+    def finish(self, job_id, owner, status, error=None):
+        return self._update(job_id, owner,
+                            lambda stages, result, _, __: (status, error))
+
+    def claim(self, job_id, owner, lease=LEASE_SECONDS):
+        """Atomically take a queued job, or one whose owner's lease lapsed.
+        True for exactly one caller however many processes race for it."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, "
+                "updated = ? WHERE id = ? AND (status = 'queued' OR "
+                "(status = 'running' AND COALESCE(lease_until, 0) < ?))",
+                (owner, now + lease, now, job_id, now))
+        return cursor.rowcount == 1
+
+    def renew(self, job_id, owner, lease=LEASE_SECONDS):
+        """Extend the lease; False once the job is finished or owned by someone else."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? "
+                "AND status = 'running'", (time.time() + lease, job_id, owner))
+        return cursor.rowcount == 1
+
+    def claimable(self, include_queued=True):
+        """Jobs a worker could claim now: lapsed leases, and optionally queued jobs."""
+        query = ("SELECT id FROM jobs WHERE status = 'running' "
+                 "AND COALESCE(lease_until, 0) < ?")
+        if include_queued:
+            query += " OR status = 'queued'"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created",
+                                      (time.time(),)).fetchall()
+        return [row[0] for row in rows]
+
+
+# ── worker side ──────────────────────────────────────────────────────────
+def _keep_lease(store, job_id, owner, stopped):
+    while not stopped.wait(LEASE_SECONDS / 3):
+        if not store.renew(job_id, owner):
+            return
+
+
+def run_job(job_id, db_path=JOBS_DB_PATH):
+    store = JobStore(db_path)
+    owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+    if not store.claim(job_id, owner):
+        return  # finished, or another worker holds a live lease on it
+    stopped = threading.Event()
+    threading.Thread(target=_keep_lease, args=(store, job_id, owner, stopped),
+                     daemon=True).start()
+    try:
+        _run_claimed(store, job_id, owner)
+    finally:
+        stopped.set()
+
+
+def _run_claimed(store, job_id, owner):
+    # Imported here so the API process never loads the models for jobs
+    import legal_backend as backend
+
+    job = store.get(job_id)
+
+    def timed(name, fn):
+        if not store.stage(job_id, owner, name, "running"):
+            # Lease lapsed and another worker took the job over
+            raise RuntimeError(f"Job {job_id} is no longer owned by this worker")
+        t0 = time.perf_counter()
+        try:
+            value = fn()
+        except Exception as e:
+            store.stage(job_id, owner, name, "failed",
+                        time.perf_counter() - t0, error=str(e))
+            raise
+        return value, time.perf_counter() - t0
+
+    try:
+        documents, seconds = timed(
+            "extract", lambda: backend.load_document(job["file_path"]))
+        store.stage(job_id, owner, "extract", "done", seconds)
+
+        analyses = job["analyses"]
+        index = None
+        if any(name != "summary" for name in analyses):
+            index, seconds = timed("index", lambda: backend.build_index(documents))
+        else:
+            seconds = 0.0
+        store.stage(job_id, owner, "index", "done", seconds)
+
+        def run(name):
+            output, elapsed = timed(
+                name, lambda: backend.ANALYSES[name](documents, index=index))
+            store.stage(job_id, owner, name, "done", elapsed, output=output)
+
+        with ThreadPoolExecutor(max_workers=len(analyses)) as pool:
+            failures = [f.exception() for f in
+                        [pool.submit(run, name) for name in analyses]]
+        failures = [str(e) for e in failures if e is not None]
+        if failures:
+            store.finish(job_id, owner, "failed", "; ".join(failures))
+        else:
+            store.finish(job_id, owner, "done")
+    except Exception as e:
+        traceback.print_exc()
+        store.finish(job_id, owner, "failed", str(e))
+
+
+class JobManager:
+    """Submits jobs to a separate process pool so the API stays responsive."""
+
+    def __init__(self, workers=2, db_path=JOBS_DB_PATH):
+        self.db_path = db_path
+        self.store = JobStore(db_path)
+        # spawn: workers start clean instead of forking a threaded server
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        # Jobs left by a crashed process are picked up again. Submitting a job
+        # another server process also holds is harmless: run_job claims it
+        # atomically, so only one worker ever runs it.
+        self._stopped = threading.Event()
+        self._resubmit(include_queued=True)
+        threading.Thread(target=self._sweep, daemon=True).start()
+
+    def _resubmit(self, include_queued):
+        for job_id in self.store.claimable(include_queued):
+            self.pool.submit(run_job, job_id, self.db_path)
+
+    def _sweep(self):
+        # Running jobs whose worker died come back once their lease lapses
+        while not self._stopped.wait(LEASE_SECONDS):
+            try:
+                self._resubmit(include_queued=False)
+            except Exception as e:
+                print("⚠️ Job sweep failed:", e)
+
+    def submit(self, file_path, analyses):
+        job_id = self.store.create(file_path, analyses)
+        self.pool.submit(run_job, job_id, self.db_path)
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def shutdown(self):
+        self._stopped.set()
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,241 @@
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms import CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+from llama_index.llms.ollama import Ollama
+
+
+RETRYABLE = (httpx.TimeoutException, httpx.TransportError,
+             TimeoutError, ConnectionError)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Backend:
+    def __init__(self, client, max_inflight):
+        self.client = client
+        self.max_inflight = max_inflight
+        self.in_flight = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+
+class OllamaPool(CustomLLM):
+    """One LLM over several Ollama hosts: least-loaded routing, per-host
+    in-flight limits and retry with backoff. Each host keeps one client, so
+    HTTP connections are reused across requests."""
+
+    model: str = Field(default="llama3")
+    hosts: list = Field(default_factory=lambda: ["http://localhost:11434"])
+    max_inflight: int = Field(default=2)
+    request_timeout: float = Field(default=120.0)
+    retries: int = Field(default=3)
+    backoff: float = Field(default=1.0)
+    temperature: float = Field(default=0.75)
+    context_window: int = Field(default=3900)
+    additional_kwargs: dict = Field(default_factory=dict)
+
+    _backends = PrivateAttr()
+    _lock = PrivateAttr()
+    _freed = PrivateAttr()
+    _async_waiters = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._backends = [
+            _Backend(Ollama(model=self.model, base_url=host,
+                            request_timeout=self.request_timeout,
+                            temperature=self.temperature,
+                            context_window=self.context_window,
+                            additional_kwargs=self.additional_kwargs),
+                     self.max_inflight)
+            for host in self.hosts
+        ]
+        self._lock = threading.Lock()
+        self._freed = threading.Condition(self._lock)
+        # Async callers may run on different event loops (server, batch,
+        # worker threads), so each waits on a future owned by its own loop
+        self._async_waiters = []
+
+    @classmethod
+    def class_name(cls):
+        return "OllamaPool"
+
+    @property
+    def metadata(self):
+        return LLMMetadata(context_window=self.context_window,
+                           model_name=self.model, is_chat_model=True)
+
+    # ── routing ───────────────────────────────────────────────────────
+    def _pick(self, avoid=None):
+        # Least-loaded host with a free slot; cooling-down hosts only as last resort
+        now = time.time()
+        free = [b for b in self._backends if b.in_flight < b.max_inflight]
+        healthy = [b for b in free if b.cooldown_until <= now and b is not avoid]
+        candidates = healthy or [b for b in free if b is not avoid] or free
+        if not candidates:
+            return None
+        low = min(b.in_flight for b in candidates)
+        backend = random.choice([b for b in candidates if b.in_flight == low])
+        backend.in_flight += 1
+        return backend
+
+    def _acquire(self, avoid=None):
+        with self._freed:
+            while True:
+                backend = self._pick(avoid)
+                if backend is not None:
+                    return backend
+                self._freed.wait()
+
+    async def _aacquire(self, avoid=None):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                backend = self._pick(avoid)
+                if backend is not None:
+                    return backend
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                    else:
+                        self._wake_async()  # we were woken; pass the freed slot on
+                raise
+
+    def _wake_async(self):
+        # Caller holds self._lock
+        while self._async_waiters:
+            loop, future = self._async_waiters.pop(0)
+            if loop.is_closed() or future.done():
+                continue
+            loop.call_soon_threadsafe(_resolve, future)
+            return
+
+    def _release(self, backend, error=None):
+        with self._freed:
+            backend.in_flight -= 1
+            if error is None:
+                backend.failures = 0
+                backend.cooldown_until = 0.0
+            else:
+                backend.failures += 1
+                backend.cooldown_until = time.time() + self.backoff * 2 ** backend.failures
+            # Wake one waiter of each kind; whoever loses the race waits again
+            self._freed.notify()
+            self._wake_async()
+
+    def set_max_inflight(self, max_inflight):
+        """Change the per-host limit on concurrent requests; calls already in
+        flight finish, and waiters are woken to re-check against the new limit."""
+        with self._freed:
+            self.max_inflight = max(1, int(max_inflight))
+            for backend in self._backends:
+                backend.max_inflight = self.max_inflight
+            self._freed.notify_all()
+            for _ in range(len(self._async_waiters)):
+                self._wake_async()
+
+    def _delay(self, attempt):
+        return self.backoff * 2 ** attempt * (0.5 + random.random())
+
+    def _call(self, method, *args, **kwargs):
+        failed = None
+        for attempt in range(self.retries + 1):
+            backend = self._acquire(avoid=failed)
+            try:
+                result = getattr(backend.client, method)(*args, **kwargs)
+            except RETRYABLE as e:
+                self._release(backend, e)
+                failed = backend
+                if attempt == self.retries:
+                    raise
+                print(f"⚠️ Ollama {method} failed ({e!r}); retrying")
+                time.sleep(self._delay(attempt))
+                continue
+            except Exception as e:
+                self._release(backend, e)
+                raise
+            self._release(backend)
+            return result
+
+    async def _acall(self, method, *args, **kwargs):
+        failed = None
+        for attempt in range(self.retries + 1):
+            backend = await self._aacquire(avoid=failed)
+            try:
+                result = await getattr(backend.client, method)(*args, **kwargs)
+            except RETRYABLE as e:
+                self._release(backend, e)
+                failed = backend
+                if attempt == self.retries:
+                    raise
+                print(f"⚠️ Ollama {method} failed ({e!r}); retrying")
+                await asyncio.sleep(self._delay(attempt))
+                continue
+            except Exception as e:
+                self._release(backend, e)
+                raise
+            self._release(backend)
+            return result
+
+    def _stream(self, method, *args, **kwargs):
+        # Retries are only safe before the first token has been handed out
+        failed = None
+        for attempt in range(self.retries + 1):
+            backend = self._acquire(avoid=failed)
+            started = False
+            try:
+                for chunk in getattr(backend.client, method)(*args, **kwargs):
+                    started = True
+                    yield chunk
+            except RETRYABLE as e:
+                self._release(backend, e)
+                failed = backend
+                if started or attempt == self.retries:
+                    raise
+                print(f"⚠️ Ollama {method} failed ({e!r}); retrying")
+                time.sleep(self._delay(attempt))
+                continue
+            except BaseException as e:
+                self._release(backend, e if isinstance(e, Exception) else None)
+                raise
+            self._release(backend)
+            return
+
+    # ── LLM interface ─────────────────────────────────────────────────
+    @llm_completion_callback()
+    def complete(self, prompt, formatted=False, **kwargs):
+        return self._call("complete", prompt, formatted=formatted, **kwargs)
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt, formatted=False, **kwargs):
+        return await self._acall("acomplete", prompt, formatted=formatted, **kwargs)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt, formatted=False, **kwargs):
+        return self._stream("stream_complete", prompt, formatted=formatted, **kwargs)
+
+    @llm_chat_callback()
+    def chat(self, messages, **kwargs):
+        return self._call("chat", messages, **kwargs)
+
+    @llm_chat_callback()
+    async def achat(self, messages, **kwargs):
+        return await self._acall("achat", messages, **kwargs)
+
+    @llm_chat_callback()
+    def stream_chat(self, messages, **kwargs):
+        return self._stream("stream_chat", messages, **kwargs)
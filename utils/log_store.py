@@ -0,0 +1,167 @@
+import atexit
+import contextvars
+import csv
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+LOG_DB_PATH = os.path.join("logs", "analysis_log.sqlite")
+LEGACY_CSV_PATH = os.path.join("logs", "session_log.csv")
+
+# Who the current request/rerun is for; set once by the app or API handler
+current_user = contextvars.ContextVar("current_user", default=None)
+
+COLUMNS = ["ts", "doc_hash", "user", "filename", "category", "content",
+           "latency_ms", "prompt_tokens", "completion_tokens", "session_id"]
+
+
+class LogStore:
+    """Analysis log in SQLite (WAL). Writes are queued and flushed in batches
+    by a background thread, so logging never sits on the request path."""
+
+    def __init__(self, path=LOG_DB_PATH, batch_size=200, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        fresh = not os.path.exists(path)
+
+        self._read_lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                doc_hash TEXT,
+                user TEXT,
+                filename TEXT,
+                category TEXT NOT NULL,
+                content TEXT,
+                latency_ms REAL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                session_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS logs_doc ON logs (doc_hash, ts);
+            CREATE INDEX IF NOT EXISTS logs_user ON logs (user, ts);
+            CREATE INDEX IF NOT EXISTS logs_category ON logs (category, ts);
+            CREATE INDEX IF NOT EXISTS logs_ts ON logs (ts);
+        """)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(logs)")}
+        if "session_id" not in existing:  # logs written before conversations had ids
+            self._conn.execute("ALTER TABLE logs ADD COLUMN session_id TEXT")
+        if fresh and os.path.exists(LEGACY_CSV_PATH):
+            self.import_csv(LEGACY_CSV_PATH)
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ── writes ────────────────────────────────────────────────────────
+    def log(self, category, content, doc_hash=None, user=None, filename=None,
+            latency_ms=None, prompt_tokens=None, completion_tokens=None,
+            session_id=None):
+        if user is None:
+            user = current_user.get()
+        self._queue.put((time.time(), doc_hash, user, filename, category,
+                         content, latency_ms, prompt_tokens, completion_tokens,
+                         session_id))
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    conn.executemany(
+                        f"INSERT INTO logs ({', '.join(COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            except sqlite3.Error as e:
+                print("⚠️ Could not write analysis log:", e)
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    def flush(self):
+        self._queue.join()
+
+    def import_csv(self, csv_path):
+        rows = []
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                try:
+                    ts = datetime.fromisoformat(record["timestamp"]).timestamp()
+                except (KeyError, ValueError):
+                    continue
+                rows.append((ts, None, None, record.get("filename"),
+                             record.get("category") or "unknown",
+                             record.get("content"), None, None, None, None))
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO logs ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+        print(f"📥 Imported {len(rows)} rows from {csv_path}")
+
+    # ── queries ───────────────────────────────────────────────────────
+    @staticmethod
+    def _where(doc_hash=None, user=None, category=None, since=None, until=None):
+        clauses, params = [], []
+        for column, value in (("doc_hash", doc_hash), ("user", user),
+                              ("category", category)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def history(self, doc_hash=None, user=None, category=None, since=None,
+                until=None, limit=100, offset=0):
+        where, params = self._where(doc_hash, user, category, since, until)
+        with self._read_lock:
+            cur = self._conn.execute(
+                f"SELECT id, {', '.join(COLUMNS)} FROM logs{where} "
+                "ORDER BY ts DESC LIMIT ? OFFSET ?", params + [limit, offset])
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def stats(self, group_by="category", doc_hash=None, user=None,
+              category=None, since=None, until=None):
+        if group_by not in ("category", "user", "doc_hash", "filename", "day"):
+            raise ValueError(f"Cannot group by {group_by!r}")
+        key = "date(ts, 'unixepoch')" if group_by == "day" else group_by
+        where, params = self._where(doc_hash, user, category, since, until)
+        with self._read_lock:
+            cur = self._conn.execute(
+                f"SELECT {key} AS {group_by}, COUNT(*) AS calls, "
+                "AVG(latency_ms) AS avg_latency_ms, MAX(latency_ms) AS max_latency_ms, "
+                "SUM(prompt_tokens) AS prompt_tokens, "
+                "SUM(completion_tokens) AS completion_tokens "
+                f"FROM logs{where} GROUP BY {key} ORDER BY calls DESC", params)
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
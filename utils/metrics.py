@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                   10, 30, 60, 120, float("inf"))
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"'))
+                    for k, v in items)
+    return "{" + body + "}"
+
+
+class Metrics:
+    """Tiny in-process metrics registry with Prometheus text exposition."""
+
+    def __init__(self, recent_size=200):
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {label key: value}
+        self._gauges = {}
+        self._histograms = {}  # name -> {label key: [bucket counts, sum, count]}
+        self._help = {}
+        self._recent = deque(maxlen=recent_size)
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            buckets, total, count = series.get(
+                key, [[0] * len(DEFAULT_BUCKETS), 0.0, 0])
+            for i, bound in enumerate(DEFAULT_BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            series[key] = [buckets, total + value, count + 1]
+
+    @contextmanager
+    def timed(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("legal_stage_seconds", elapsed, stage=stage, **labels)
+            with self._lock:
+                self._recent.append({"stage": stage, "seconds": round(elapsed, 4),
+                                     "at": time.time(), **labels})
+
+    def recent(self, limit=20):
+        with self._lock:
+            return list(self._recent)[-limit:][::-1]
+
+    def stage_summary(self):
+        """Per-stage call count, total and mean seconds (for dashboards)."""
+        with self._lock:
+            series = dict(self._histograms.get("legal_stage_seconds", {}))
+        summary = {}
+        for key, (_, total, count) in series.items():
+            stage = dict(key)["stage"]
+            entry = summary.setdefault(stage, {"count": 0, "total_seconds": 0.0})
+            entry["count"] += count
+            entry["total_seconds"] += total
+        for entry in summary.values():
+            entry["mean_seconds"] = round(entry["total_seconds"] / entry["count"], 4)
+            entry["total_seconds"] = round(entry["total_seconds"], 3)
+        return summary
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(store.items()):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in series.items():
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, (buckets, total, count) in series.items():
+                    for bound, bucket_count in zip(DEFAULT_BUCKETS, buckets):
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', le)])} "
+                                     f"{bucket_count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("legal_stage_seconds", "Wall time per pipeline stage")
+metrics.describe("legal_bytes_processed_total", "Input bytes read by load_document")
+metrics.describe("legal_pages_processed_total", "PDF pages extracted, by method")
+metrics.describe("legal_llm_tokens_total", "Estimated LLM tokens sent/generated")
+metrics.describe("legal_cache_requests_total", "Cache lookups by cache and result")
+metrics.describe("legal_cache_hit_ratio", "Hit ratio per cache since start")
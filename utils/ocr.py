@@ -0,0 +1,114 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+
+OCR_DPI = 200
+# Upper bound on OCR processes for the whole process, however many documents
+# are being extracted at once
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", "0")) or os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # One Tesseract thread per process; parallelism comes from the pool
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _ocr_page(file_path, page_number, dpi):
+    # Rasterize a single page inside the worker so only one bitmap is alive per core
+    t0 = time.perf_counter()
+    images = convert_from_path(
+        file_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    t1 = time.perf_counter()
+    text = "".join(pytesseract.image_to_string(img) for img in images)
+    t2 = time.perf_counter()
+    return {
+        "page": page_number,
+        "text": text,
+        "chars": len(text),
+        "rasterize_seconds": round(t1 - t0, 3),
+        "ocr_seconds": round(t2 - t1, 3),
+    }
+
+
+def page_count(file_path):
+    return pdfinfo_from_path(file_path)["Pages"]
+
+
+def set_workers(workers):
+    """Cap the shared pool at ``workers`` processes; call before the first OCR,
+    e.g. from a process-pool initializer that already runs one worker per core."""
+    global OCR_WORKERS
+    with _pool_lock:
+        OCR_WORKERS = max(1, int(workers))
+
+
+def _shared_pool():
+    # spawn: workers start clean instead of forking a threaded server
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS, initializer=_init_worker,
+                mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_ocr_pages(file_path, pages=None, window=None, dpi=OCR_DPI):
+    """Yield per-page OCR results in page order while later pages are still running.
+
+    Pages go to one pool shared by every caller, so concurrent documents queue
+    for the same OCR_WORKERS processes; ``window`` caps this document's pages
+    in flight so one long scan cannot fill the queue ahead of the others.
+    """
+    if pages is None:
+        pages = range(1, page_count(file_path) + 1)
+    pages = list(pages)
+    if not pages:
+        return
+
+    window = max(window or OCR_WORKERS * 2, 1)
+    pool = _shared_pool()
+    pending = {}
+    submitted = 0
+    try:
+        for position, page_number in enumerate(pages):
+            while submitted < len(pages) and submitted < position + window:
+                page = pages[submitted]
+                pending[page] = pool.submit(_ocr_page, file_path, page, dpi)
+                submitted += 1
+            yield pending.pop(page_number).result()
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise
+    finally:
+        # An abandoned generator should not leave its pages queued
+        for future in pending.values():
+            future.cancel()
@@ -0,0 +1,51 @@
+import re
+import time
+
+from utils.ocr import iter_ocr_pages, page_count
+
+
+MIN_TEXT_CHARS = 25  # fewer alphanumerics than this → treat the page as scanned
+
+
+def _has_text_layer(text, min_chars=MIN_TEXT_CHARS):
+    return len(re.findall(r"\w", text or "")) >= min_chars
+
+
+def _text_layer(file_path):
+    from pypdf import PdfReader
+
+    texts = []
+    for page in PdfReader(file_path).pages:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception:
+            texts.append("")
+    return texts
+
+
+def extract_pdf(file_path, min_chars=MIN_TEXT_CHARS):
+    """Per-page hybrid extraction: text layer where usable, OCR only for the rest."""
+    start = time.perf_counter()
+    try:
+        texts = _text_layer(file_path)
+    except Exception as e:
+        print("⚠️ Unreadable PDF text layer, falling back to OCR:", e)
+        texts = [""] * page_count(file_path)
+
+    scanned = [i + 1 for i, text in enumerate(texts)
+               if not _has_text_layer(text, min_chars)]
+    ocr_timings = []
+    if scanned:
+        print(f"🖨️ OCR on {len(scanned)}/{len(texts)} pages")
+        for result in iter_ocr_pages(file_path, scanned):
+            texts[result["page"] - 1] = result["text"]
+            ocr_timings.append(
+                {k: v for k, v in result.items() if k != "text"})
+
+    return {
+        "text": "\n".join(texts),
+        "page_count": len(texts),
+        "ocr_pages": scanned,
+        "ocr_page_timings": ocr_timings,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
@@ -1,6 +1,8 @@
 import json
 import os
 
+from utils.disk_cache import file_hash
+
 def load_prompts(file_path="prompts/prompts.json"):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Prompt file not found at {file_path}")
@@ -9,3 +11,7 @@ def load_prompts(file_path="prompts/prompts.json"):
         prompts = json.load(f)
     return prompts
 
+
+def prompts_version(file_path="prompts/prompts.json"):
+    # Any edit to prompts.json changes this, which invalidates cached responses
+    return file_hash(file_path)
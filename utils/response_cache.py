@@ -0,0 +1,135 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from utils.disk_cache import content_hash
+
+
+RESPONSE_CACHE_PATH = os.path.join("cache", "responses.sqlite")
+ACCESS_RESOLUTION = 300  # seconds; LRU order does not need finer access times
+
+
+def normalize_prompt(prompt):
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+class ResponseCache:
+    """Deterministic LLM response cache in SQLite, with TTL and size eviction.
+
+    `version` is folded into every key (we pass the prompts.json hash), and
+    rows written under any other version are purged on startup. The total
+    size is kept by triggers in `cache_size`, so a put never scans the table,
+    and it stays right when several processes share the database.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, version="",
+                 ttl_seconds=7 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, version TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+        self._conn.executescript("""
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS cache_size (
+                id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+            INSERT OR IGNORE INTO cache_size
+                SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+            CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses
+                BEGIN UPDATE cache_size SET total = total + NEW.size WHERE id = 0; END;
+            CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses
+                BEGIN UPDATE cache_size SET total = total - OLD.size WHERE id = 0; END;
+            CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses
+                BEGIN UPDATE cache_size SET total = total + NEW.size - OLD.size WHERE id = 0; END;
+            COMMIT;
+        """)
+        self._conn.execute(
+            "DELETE FROM responses WHERE version != ?", (version,))
+        self._conn.commit()
+
+    def key(self, prompt, model, params=None, doc_hash=None):
+        return content_hash(
+            self.version, model, json.dumps(params or {}, sort_keys=True),
+            doc_hash or "", normalize_prompt(prompt))
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created, accessed FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                if now - row[2] > ACCESS_RESOLUTION:  # most hits need no write
+                    self._conn.execute(
+                        "UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        if not response or not response.strip():
+            return  # never pin an empty/failed generation
+        now = time.time()
+        with self._lock:
+            # An upsert, not INSERT OR REPLACE: replace-deletes skip the triggers
+            self._conn.execute(
+                "INSERT INTO responses "
+                "(key, response, version, created, accessed, size) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "response = excluded.response, version = excluded.version, "
+                "created = excluded.created, accessed = excluded.accessed, "
+                "size = excluded.size",
+                (key, response, self.version, now, now,
+                 len(response.encode("utf-8"))))
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute(
+            "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute(
+            "SELECT total FROM cache_size WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first, reading only as many rows as needed
+        while total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
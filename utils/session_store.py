@@ -0,0 +1,215 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.tokens import estimate_tokens
+
+
+SESSION_DB_PATH = os.path.join("cache", "sessions.sqlite")
+
+
+def _empty_state():
+    return {"summary": "", "turns": [], "updated": time.time()}
+
+
+class MemorySessionBackend:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            return json.loads(json.dumps(state)) if state else None
+
+    def update(self, session_id, fn):
+        # Atomic read-modify-write; fn gets a private copy (or None)
+        with self._lock:
+            state = self._sessions.get(session_id)
+            state = fn(json.loads(json.dumps(state)) if state else None)
+            self._sessions[session_id] = state
+            return json.loads(json.dumps(state))
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_before(self, cutoff):
+        with self._lock:
+            idle = [sid for sid, s in self._sessions.items() if s["updated"] < cutoff]
+            for sid in idle:
+                del self._sessions[sid]
+            return len(idle)
+
+
+class SQLiteSessionBackend:
+    """On-disk sessions so several server workers see the same conversations."""
+
+    def __init__(self, path=SESSION_DB_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly below
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                     isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, "
+            "updated REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE session_id = ?",
+                (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, session_id, fn):
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes
+        # appending to one session cannot both read the old state
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT state FROM sessions WHERE session_id = ?",
+                    (session_id,)).fetchone()
+                state = fn(json.loads(row[0]) if row else None)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, state, updated) "
+                    "VALUES (?, ?, ?)",
+                    (session_id, json.dumps(state), state["updated"]))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return state
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def evict_before(self, cutoff):
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM sessions WHERE updated < ?", (cutoff,))
+        return cur.rowcount
+
+
+class SessionStore:
+    """Per-session chat history, capped by tokens and evicted when idle.
+
+    There is no store-wide lock: each append is an atomic update in the
+    backend, and the slow LLM compaction runs between two such updates so
+    it only ever delays its own session.
+    """
+
+    def __init__(self, backend=None, max_tokens=2000, ttl_seconds=3600,
+                 compact_fn=None, keep_recent_turns=4, sweep_interval=60):
+        self.backend = backend or MemorySessionBackend()
+        self.max_tokens = max_tokens
+        self.ttl_seconds = ttl_seconds
+        self.compact_fn = compact_fn
+        self.keep_recent_turns = keep_recent_turns
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()  # guards the two fields below only
+        self._last_sweep = 0.0
+        self._compacting = set()
+
+    @staticmethod
+    def _turn_tokens(turn):
+        return estimate_tokens(turn[0]) + estimate_tokens(turn[1])
+
+    def _size(self, state):
+        return estimate_tokens(state["summary"]) + sum(
+            self._turn_tokens(t) for t in state["turns"])
+
+    def _maybe_sweep(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        self.backend.evict_before(now - self.ttl_seconds)
+
+    def _live(self, state):
+        if state and time.time() - state["updated"] > self.ttl_seconds:
+            return None
+        return state
+
+    def get(self, session_id):
+        self._maybe_sweep()
+        state = self._live(self.backend.load(session_id)) or _empty_state()
+        return state["summary"], [tuple(t) for t in state["turns"]]
+
+    def _cap(self, state):
+        # Hard cap: drop the oldest turns, always keeping the newest one
+        while self._size(state) > self.max_tokens and len(state["turns"]) > 1:
+            state["turns"].pop(0)
+        return state
+
+    def _split_for_compaction(self, state):
+        # Everything but the most recent turns gets folded into the summary;
+        # the kept turns may use at most half of the budget
+        keep, used = 0, 0
+        for turn in reversed(state["turns"][-self.keep_recent_turns:]):
+            used += self._turn_tokens(turn)
+            if keep and used > self.max_tokens // 2:
+                break
+            keep += 1
+        return state["turns"][:-keep]
+
+    def _compact(self, session_id, state):
+        old = self._split_for_compaction(state)
+        if not old:
+            return self.backend.update(session_id, lambda s: self._cap(s or state))
+        transcript = "\n".join(f"User: {q}\nAI: {a}" for q, a in old)
+        try:
+            summary = self.compact_fn(state["summary"], transcript).strip()
+        except Exception as e:
+            print("⚠️ History compaction failed:", e)
+            summary = None
+
+        def merge(current):
+            current = current or state
+            # Apply only if nobody compacted or cleared these turns meanwhile;
+            # turns appended during the LLM call are kept
+            if (summary is not None and current["summary"] == state["summary"]
+                    and current["turns"][:len(old)] == old):
+                current["summary"] = summary
+                current["turns"] = current["turns"][len(old):]
+            return self._cap(current)
+
+        return self.backend.update(session_id, merge)
+
+    def append(self, session_id, query, answer):
+        self._maybe_sweep()
+        compacting = self.compact_fn is not None
+
+        def add_turn(state):
+            state = self._live(state) or _empty_state()
+            state["turns"].append([query, answer])
+            state["updated"] = time.time()
+            # With compaction the cap waits until the summary is merged
+            return state if compacting else self._cap(state)
+
+        state = self.backend.update(session_id, add_turn)
+        if not compacting or self._size(state) <= self.max_tokens:
+            return
+        with self._lock:
+            if session_id in self._compacting:
+                return  # the in-flight compaction caps this turn too
+            self._compacting.add(session_id)
+        try:
+            self._compact(session_id, state)
+        finally:
+            with self._lock:
+                self._compacting.discard(session_id)
+
+    def clear(self, session_id):
+        self.backend.delete(session_id)
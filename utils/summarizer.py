@@ -0,0 +1,102 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.tokens import estimate_tokens, split_by_tokens
+
+
+class MapReduceSummarizer:
+    """Summarizes arbitrarily long text: parallel section map, then reduce levels.
+
+    Section results are not stored here: ``complete_fn``/``acomplete_fn`` go
+    through the response cache, so a failed run still resumes from the
+    sections that already finished.
+    """
+
+    def __init__(self, complete_fn, prompts, section_tokens=2500,
+                 max_inflight=4, acomplete_fn=None):
+        self.complete_fn = complete_fn
+        self.acomplete_fn = acomplete_fn
+        self.prompts = prompts
+        self.section_tokens = section_tokens
+        self.max_inflight = max_inflight
+
+    def _run(self, template, content):
+        result = self.complete_fn(template.format(content=content)).strip()
+        if not result:
+            raise ValueError("LLM returned an empty section summary")
+        return result
+
+    def _run_all(self, template, contents):
+        # Bounded fan-out: at most `max_inflight` Ollama requests at once
+        with ThreadPoolExecutor(max_workers=self.max_inflight) as pool:
+            return list(pool.map(lambda c: self._run(template, c), contents))
+
+    async def _arun(self, template, content, semaphore):
+        async with semaphore:
+            result = (await self.acomplete_fn(template.format(content=content))).strip()
+        if not result:
+            raise ValueError("LLM returned an empty section summary")
+        return result
+
+    async def _arun_all(self, template, contents, semaphore):
+        return await asyncio.gather(
+            *[self._arun(template, c, semaphore) for c in contents])
+
+    # ── map / reduce ───────────────────────────────────────────────────
+    def _group(self, partials):
+        groups, current, current_tokens = [], [], 0
+        for partial in partials:
+            tokens = estimate_tokens(partial) + 1
+            if current and current_tokens + tokens > self.section_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(partial)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def _reduce_groups(self, partials):
+        groups = self._group(partials)
+        if len(groups) > 1 and len(groups) == len(partials):
+            # Partials too long to share a budget; pair them so each level halves
+            groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+        return ["\n\n".join(g) for g in groups]
+
+    def reduce_input(self, text):
+        """Run the map step and all but the last reduce; returns the final reduce input."""
+        sections = split_by_tokens(text, self.section_tokens)
+        print(f"🧩 Map step: {len(sections)} sections")
+        partials = self._run_all(self.prompts["summarize_section"], sections)
+
+        # Reduce level by level until everything fits in one final call
+        while True:
+            merged = self._reduce_groups(partials)
+            if len(merged) == 1:
+                return merged[0]
+            print(f"🔁 Reduce step: {len(partials)} → {len(merged)}")
+            partials = self._run_all(self.prompts["summarize_reduce"], merged)
+
+    def final_prompt(self, content):
+        return self.prompts["summarize_reduce"].format(content=content)
+
+    def summarize(self, text):
+        return self._run(self.prompts["summarize_reduce"], self.reduce_input(text))
+
+    async def asummarize(self, text):
+        if self.acomplete_fn is None:
+            raise RuntimeError("No async completion function configured")
+        semaphore = asyncio.Semaphore(self.max_inflight)
+        sections = split_by_tokens(text, self.section_tokens)
+        print(f"🧩 Map step: {len(sections)} sections")
+        partials = await self._arun_all(
+            self.prompts["summarize_section"], sections, semaphore)
+
+        while True:
+            merged = self._reduce_groups(partials)
+            if len(merged) == 1:
+                return await self._arun(
+                    self.prompts["summarize_reduce"], merged[0], semaphore)
+            print(f"🔁 Reduce step: {len(partials)} → {len(merged)}")
+            partials = await self._arun_all(
+                self.prompts["summarize_reduce"], merged, semaphore)
@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from utils.disk_cache import enforce_limits, remove_entry, touch
+
+
+TEXT_CACHE_DIR = os.path.join("cache", "text")
+
+
+class TextCache:
+    """Extracted-text cache keyed by file content hash: memory LRU, then disk LRU."""
+
+    def __init__(self, root=TEXT_CACHE_DIR, memory_bytes=64 * 1024 * 1024,
+                 max_entries=2000, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.memory_bytes = memory_bytes
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def _remember(self, key, entry):
+        size = len(entry["text"])
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_used -= len(self._memory.pop(key)["text"])
+            self._memory[key] = entry
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, old = self._memory.popitem(last=False)
+                self._memory_used -= len(old["text"])
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            remove_entry(path)
+            return None
+
+        touch(path)
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, text, metadata=None):
+        entry = {"text": text, "metadata": metadata or {}}
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(key)
+        tmp_path = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._remember(key, entry)
+        enforce_limits(self.root, self.max_entries, self.max_bytes,
+                       keep=(os.path.basename(path),))
+        return entry
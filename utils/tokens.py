@@ -0,0 +1,67 @@
+import re
+
+
+CHARS_PER_TOKEN = 4  # rough llama3 average for English legal prose
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _hard_split(text, max_chars):
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def _pieces(text, max_tokens):
+    # Paragraphs first, then sentences, then a hard character cut
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        if estimate_tokens(para) <= max_tokens:
+            yield para
+            continue
+        for sentence in re.split(r"(?<=[.;:])\s+", para):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+            else:
+                yield from _hard_split(sentence, max_chars)
+
+
+def split_by_tokens(text, max_tokens):
+    """Split text into sections of at most `max_tokens`, on natural boundaries."""
+    sections, current, current_tokens = [], [], 0
+    for piece in _pieces(text, max_tokens):
+        piece_tokens = estimate_tokens(piece) + 1
+        if current and current_tokens + piece_tokens > max_tokens:
+            sections.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        sections.append("\n\n".join(current))
+    return sections
+
+
+def truncate_to_tokens(text, max_tokens):
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+
+def fit_to_budget(texts, max_tokens, min_tokens=64):
+    """Keep texts in the given priority order until the token budget runs out."""
+    kept, used = [], 0
+    for text in texts:
+        tokens = estimate_tokens(text) + 1
+        if used + tokens <= max_tokens:
+            kept.append(text)
+            used += tokens
+            continue
+        remaining = max_tokens - used
+        if remaining >= min_tokens:
+            kept.append(truncate_to_tokens(text, remaining - 1))
+        break
+    return kept